@@ -1,109 +1,256 @@
 import sys
 import csv
 import os
+from bisect import bisect_left
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from PyQt6 import uic
-from PyQt6.QtWidgets import QApplication, QMainWindow, QTableWidgetItem, QComboBox
+from PyQt6.QtWidgets import QApplication, QMainWindow, QComboBox, QProgressBar, QPushButton, QFileDialog
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QThread, pyqtSignal
 from PyQt6.QtGui import QColor
+from olimp_engine import ALL, TOTAL, ParticipantStore, LeaderboardIndex, parse_header, parse_row, parse_file
+
+CHUNK_SIZE = 5000
+POLL_INTERVAL = 0.1
+MEDAL_COLORS = {
+    1: QColor(255, 215, 0),
+    2: QColor(192, 192, 192),
+    3: QColor(205, 127, 50),
+}
+
+
+class CsvLoader(QThread):
+    chunkLoaded = pyqtSignal(list, list)
+    progressChanged = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, filename, chunk_size=CHUNK_SIZE, parent=None):
+        super().__init__(parent)
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+
+    def lines(self, f):
+        for raw in f:
+            self.bytes_read += len(raw)
+            yield raw.decode('utf-8')
+
+    def run(self):
+        try:
+            total = os.path.getsize(self.filename) or 1
+            with open(self.filename, 'rb') as f:
+                reader = csv.reader(self.lines(f))
+                tasks, score_column = parse_header(next(reader, []))
+                chunk = []
+                for row in reader:
+                    if self.isInterruptionRequested():
+                        return
+                    entry = parse_row(row, score_column, len(tasks))
+                    if entry is not None:
+                        chunk.append(entry)
+                    if len(chunk) >= self.chunk_size:
+                        self.chunkLoaded.emit(tasks, chunk)
+                        self.progressChanged.emit(self.bytes_read * 100 // total)
+                        chunk = []
+                if chunk:
+                    self.chunkLoaded.emit(tasks, chunk)
+                self.progressChanged.emit(100)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class MergeLoader(QThread):
+    chunkLoaded = pyqtSignal(list, list)
+    progressChanged = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, filenames, parent=None):
+        super().__init__(parent)
+        self.filenames = filenames
+
+    def run(self):
+        executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        futures = {executor.submit(parse_file, filename): filename for filename in self.filenames}
+        pending = set(futures)
+        try:
+            while pending:
+                if self.isInterruptionRequested():
+                    return
+                done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        tasks, rows = future.result()
+                    except Exception as e:
+                        self.failed.emit(f"{futures[future]}: {e}")
+                    else:
+                        self.chunkLoaded.emit(tasks, rows)
+                if done:
+                    self.progressChanged.emit((len(futures) - len(pending)) * 100 // len(futures))
+        finally:
+            if pending:
+                self.terminate_workers(executor)
+            executor.shutdown(wait=not pending, cancel_futures=True)
+
+    @staticmethod
+    def terminate_workers(executor):
+        terminate = getattr(executor, "terminate_workers", None)
+        if terminate is not None:
+            terminate()
+            return
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+
+
+class LeaderboardModel(QAbstractTableModel):
+    HEADERS = ["Логин", "ФИО", "Баллы"]
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.rows = []
+        self.ranks = []
+
+    def set_bucket(self, rows, ranks):
+        self.beginResetModel()
+        self.rows = rows
+        self.ranks = ranks
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS) + len(self.store.task_names)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            i = int(self.rows[index.row()])
+            column = index.column()
+            if column == 0:
+                return self.store.login(i)
+            if column == 1:
+                return self.store.name(i)
+            if column == 2:
+                return str(self.store.scores[i])
+            return self.store.task_cell(column - len(self.HEADERS), i)
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return MEDAL_COLORS.get(int(self.ranks[index.row()]))
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            if section < len(self.HEADERS):
+                return self.HEADERS[section]
+            return self.store.task_names[section - len(self.HEADERS)]
+        return None
 
 
 class OlympiadApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, filenames=("resources/olimp.csv",)):
         super().__init__()
         uic.loadUi("ui/olimp.ui", self)
         self.setWindowTitle("Результаты")
         self.resize(800, 600)
-        self.data = []
-        self.schools = set()
-        self.classes = set()
-        self.load_data("resources/olimp.csv")
-        self.school_combo.addItem("Все")
-        self.class_combo.addItem("Все")
-        self.school_combo.addItems(sorted(self.schools))
-        self.class_combo.addItems(sorted(self.classes))
+        self.data = ParticipantStore()
+        self.index = LeaderboardIndex(self.data)
+        self.model = LeaderboardModel(self.data, self)
+        self.table.setModel(self.model)
+        self.loader = None
+        self.progress_bar = QProgressBar()
+        self.cancel_button = QPushButton("Отмена")
+        self.cancel_button.clicked.connect(self.cancel_loading)
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        self.statusBar().addPermanentWidget(self.cancel_button)
+        self.school_combo.addItem(ALL)
+        self.class_combo.addItem(ALL)
+        self.task_combo.addItem(TOTAL)
         self.school_combo.currentTextChanged.connect(self.apply_filters)
         self.class_combo.currentTextChanged.connect(self.apply_filters)
-        self.apply_filters()
+        self.task_combo.currentIndexChanged.connect(self.apply_filters)
+        self.open_button.clicked.connect(self.open_files)
+        self.load_files(list(filenames))
 
-    def load_data(self, filename):
-        if not os.path.exists(filename):
+    def open_files(self):
+        filenames, _ = QFileDialog.getOpenFileNames(self, "Выберите файлы результатов", os.path.dirname(__file__), "CSV (*.csv)")
+        if filenames:
+            self.load_files(filenames)
+
+    def load_files(self, filenames):
+        missing = [filename for filename in filenames if not os.path.exists(filename)]
+        for filename in missing:
             print(f"ФаЙЛ'{filename}' не найден.")
+        filenames = [filename for filename in filenames if filename not in missing]
+        if not filenames:
             return
+        self.cancel_loading()
+        for combo in (self.school_combo, self.class_combo, self.task_combo):
+            combo.blockSignals(True)
+            while combo.count() > 1:
+                combo.removeItem(combo.count() - 1)
+            combo.blockSignals(False)
         self.data.clear()
-        self.schools.clear()
-        self.classes.clear()
-        try:
-            with open(filename, newline='', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                header = next(reader) 
+        self.index.build()
+        self.apply_filters()
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.cancel_button.show()
+        if len(filenames) == 1:
+            self.loader = CsvLoader(filenames[0], parent=self)
+        else:
+            self.loader = MergeLoader(filenames, parent=self)
+        self.loader.chunkLoaded.connect(self.on_chunk_loaded)
+        self.loader.progressChanged.connect(self.progress_bar.setValue)
+        self.loader.failed.connect(lambda message: print(f"Ошибка при чтении файла: {message}"))
+        self.loader.finished.connect(self.on_loading_finished)
+        self.loader.start()
 
-                for row in reader:
-                    if len(row) < 8:
-                        continue
-                    user_name = row[1]
-                    login = row[2]
-                    score_str = row[7]
-                    if login.startswith("sh-kaluga16-"):
-                        parts = login.split('-')
-                        if len(parts) >= 5:
-                            school = parts[2]
-                            class_num = parts[3]
-                            try:
-                                score = int(score_str) if score_str.isdigit() else 0
-                                self.schools.add(school)
-                                self.classes.add(class_num)
-                                self.data.append({
-                                    'login': login,
-                                    'name': user_name,
-                                    'score': score,
-                                    'school': school,
-                                    'class': class_num
-                                })
-                            except ValueError:
-                                continue
-        except Exception as e:
-            print(f"Ошибка при чтении файла: {e}")
+    def on_chunk_loaded(self, tasks, chunk):
+        if self.sender() is not self.loader:
+            return
+        known_schools = len(self.data.school_names)
+        known_classes = len(self.data.class_names)
+        known_tasks = len(self.data.task_names)
+        start, changed = self.data.extend(chunk, tasks)
+        for school in self.data.school_names[known_schools:]:
+            self.insert_combo_item(self.school_combo, school)
+        for class_num in self.data.class_names[known_classes:]:
+            self.insert_combo_item(self.class_combo, class_num)
+        self.task_combo.addItems(self.data.task_names[known_tasks:])
+        touched = self.index.add(start, len(self.data), changed)
+        current = self.index.key(self.school_combo.currentText(), self.class_combo.currentText())
+        if current in touched or len(self.data.task_names) > known_tasks:
+            self.apply_filters()
+
+    @staticmethod
+    def insert_combo_item(combo, text):
+        items = [combo.itemText(i) for i in range(1, combo.count())]
+        combo.insertItem(1 + bisect_left(items, text), text)
+
+    def cancel_loading(self):
+        if self.loader is not None and self.loader.isRunning():
+            self.loader.requestInterruption()
+            self.loader.wait()
+        self.on_loading_finished()
+
+    def on_loading_finished(self):
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+
+    def closeEvent(self, event):
+        self.cancel_loading()
+        event.accept()
 
     def apply_filters(self):
         selected_school = self.school_combo.currentText()
         selected_class = self.class_combo.currentText()
-        filtered = []
-        for entry in self.data:
-            match_school = (selected_school == "Все") or (entry['school'] == selected_school)
-            match_class = (selected_class == "Все") or (entry['class'] == selected_class)
-            if match_school and match_class:
-                filtered.append(entry)
-        filtered.sort(key=lambda x: x['score'], reverse=True)
-        places = {}
-        if filtered:
-            rank = 1
-            prev_score = filtered[0]['score']
-            for entry in filtered:
-                if entry['score'] != prev_score:
-                    rank += 1
-                    prev_score = entry['score']
-                places[entry['login']] = rank      
-        self.table.setRowCount(len(filtered))
-        for row_idx, entry in enumerate(filtered):
-            self.table.setItem(row_idx, 0, QTableWidgetItem(entry['login']))
-            self.table.setItem(row_idx, 1, QTableWidgetItem(entry['name']))
-            self.table.setItem(row_idx, 2, QTableWidgetItem(str(entry['score'])))
-            place = places[entry['login']]
-            color = None
-            if place == 1:
-                color = QColor(255, 215, 0) 
-            elif place == 2:
-                color = QColor(192, 192, 192) 
-            elif place == 3:
-                color = QColor(205, 127, 50) 
-
-            if color:
-                for col in range(3):
-                    self.table.item(row_idx, col).setBackground(color)
-
+        metric = self.task_combo.currentIndex() - 1
+        self.model.set_bucket(*self.index.lookup(selected_school, selected_class, metric))
         self.table.resizeColumnsToContents()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = OlympiadApp()
+    window = OlympiadApp(sys.argv[1:] or ("resources/olimp.csv",))
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
@@ -1,12 +1,68 @@
 import sys
 import os
+import csv
+import json
 import sqlite3
+import string
+import argparse
+from itertools import islice
 from datetime import datetime
 from pathlib import Path
-from PyQt6.QtWidgets import QApplication, QMainWindow, QTableWidgetItem, QMessageBox,QDialog, QFormLayout, QLineEdit, QSpinBox, QComboBox, QPushButton, QVBoxLayout
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox, QFileDialog, QProgressDialog, QDialog, QFormLayout, QLineEdit, QSpinBox, QComboBox, QPushButton, QVBoxLayout
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
 from PyQt6 import uic
+from db_writer import DatabaseWriter
 
+PAGE_SIZE = 200
+FILTER_DEBOUNCE_MS = 250
+COLUMNS = ["id", "title", "year", "duration", "genre"]
+IMPORT_BATCH_SIZE = 5000
+DB_FILE = "resources/films_db.sqlite"
+FILMS_QUERY = """
+    SELECT f.id, f.title, f.year, f.duration, g.title AS genre, f.genre AS genre_id
+    FROM films f
+    JOIN genres g ON f.genre = g.id
+"""
+MIGRATIONS = [
+    [
+        "DROP INDEX IF EXISTS films_id_uindex",
+        "DROP INDEX IF EXISTS genres_id_uindex",
+        "CREATE INDEX IF NOT EXISTS films_title_idx ON films (title, id, year, duration, genre)",
+        "CREATE INDEX IF NOT EXISTS films_genre_idx ON films (genre)",
+        "ANALYZE",
+    ],
+    [
+        "CREATE INDEX IF NOT EXISTS films_year_idx ON films (year, id)",
+        "CREATE INDEX IF NOT EXISTS films_duration_idx ON films (duration, id)",
+        "ANALYZE",
+    ],
+    [
+        "CREATE INDEX IF NOT EXISTS genres_title_idx ON genres (title, id)",
+        "ANALYZE",
+    ],
+]
+SORT_COLUMNS = {
+    "id": [("f.id", "id")],
+    "title": [("f.title", "title"), ("f.id", "id")],
+    "year": [("f.year", "year"), ("f.id", "id")],
+    "duration": [("f.duration", "duration"), ("f.id", "id")],
+    "genre": [("g.title", "genre"), ("g.id", "genre_id"), ("f.id", "id")],
+}
+FILTER_CLAUSES = {
+    "year_from": "f.year >= ?",
+    "year_to": "f.year <= ?",
+    "duration_from": "f.duration >= ?",
+    "duration_to": "f.duration <= ?",
+    "genre_id": "f.genre = ?",
+}
+FILTER_TESTS = {
+    "year_from": lambda film, value: film["year"] >= value,
+    "year_to": lambda film, value: film["year"] <= value,
+    "duration_from": lambda film, value: film["duration"] >= value,
+    "duration_to": lambda film, value: film["duration"] <= value,
+    "genre_id": lambda film, value: film["genre_id"] == value,
+}
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
 
 class FilmDatabaseManager:
     def __init__(self, db_path: str):
@@ -14,55 +70,332 @@ class FilmDatabaseManager:
             QMessageBox.critical(None, f"Файл базы данных не найден:\n{db_path}")
             sys.exit(1)
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
+        self.conn = self.connect()
+        self.writer = DatabaseWriter(self.connect)
+        self.genre_titles = None
+        self.genre_ids = None
+        self.migrate()
 
-    def get_films_with_genres(self):
+    def connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def migrate(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, statements in enumerate(MIGRATIONS[version:], version + 1):
+            with self.conn:
+                self.conn.execute("BEGIN")
+                for statement in statements:
+                    self.conn.execute(statement)
+                self.conn.execute(f"PRAGMA user_version = {number}")
+
+    def explain(self, sql, params=()):
+        cur = self.conn.cursor()
+        cur.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row["detail"] for row in cur.fetchall()]
+
+    @staticmethod
+    def filter_clauses(filters, skip=()):
+        clauses = []
+        params = []
+        if filters.get("title") and "title" not in skip:
+            pattern = filters["title"].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("f.title LIKE ? ESCAPE '\\'")
+            params.append(f"%{pattern}%")
+        for name, clause in FILTER_CLAUSES.items():
+            if filters.get(name) is not None and name not in skip:
+                clauses.append(clause)
+                params.append(filters[name])
+        return clauses, params
+
+    def get_films_page(self, after=None, limit=PAGE_SIZE, sort="title", descending=False, filters=None):
+        exprs = [expr for expr, _ in SORT_COLUMNS[sort]]
+        clauses, params = self.filter_clauses(filters or {})
+        if after is not None:
+            placeholders = ", ".join("?" * len(exprs))
+            clauses.append(f"({', '.join(exprs)}) {'<' if descending else '>'} ({placeholders})")
+            params.extend(after)
+        direction = "DESC" if descending else "ASC"
+        sql = FILMS_QUERY
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY " + ", ".join(f"{expr} {direction}" for expr in exprs) + " LIMIT ?"
         cur = self.conn.cursor()
-        cur.execute("""
-            SELECT f.id, f.title, f.year, f.duration, g.title AS genre
-            FROM films f
-            JOIN genres g ON f.genre = g.id
-            ORDER BY f.title
-        """)
+        cur.execute(sql, params + [limit])
         return cur.fetchall()
 
-    def get_column_names(self):
+    def get_genre_facets(self, filters=None):
+        clauses, params = self.filter_clauses(filters or {}, skip=("genre_id",))
+        condition = "".join(" AND " + clause for clause in clauses)
         cur = self.conn.cursor()
-        cur.execute("""
-            SELECT f.id, f.title, f.year, f.duration, g.title AS genre
-            FROM films f
-            JOIN genres g ON f.genre = g.id
-            LIMIT 0
-        """)
-        return [desc[0] for desc in cur.description]
+        cur.execute(f"""
+            SELECT g.id, g.title, COUNT(f.id) AS films
+            FROM genres g
+            LEFT JOIN films f ON f.genre = g.id{condition}
+            GROUP BY g.id
+            ORDER BY g.title
+        """, params)
+        facets = cur.fetchall()
+        if self.genre_titles is None:
+            self.genre_titles = {row["id"]: row["title"] for row in facets}
+            self.genre_ids = {title: genre_id for genre_id, title in self.genre_titles.items()}
+        return facets
 
-    def get_all_genres(self):
+    def get_film(self, film_id):
         cur = self.conn.cursor()
-        cur.execute("SELECT id, title FROM genres ORDER BY title")
-        return [(row[0], row[1]) for row in cur.fetchall()]
+        cur.execute(FILMS_QUERY + " WHERE f.id = ?", (film_id,))
+        return cur.fetchone()
+
+    def load_genres(self):
+        if self.genre_titles is None:
+            cur = self.conn.cursor()
+            cur.execute("SELECT id, title FROM genres ORDER BY title")
+            self.genre_titles = {row["id"]: row["title"] for row in cur.fetchall()}
+            self.genre_ids = {title: genre_id for genre_id, title in self.genre_titles.items()}
+        return self.genre_titles
+
+    def invalidate_genres(self):
+        self.genre_titles = None
+        self.genre_ids = None
+
+    def get_all_genres(self):
+        return list(self.load_genres().items())
+
+    def genre_title(self, genre_id):
+        return self.load_genres().get(genre_id)
 
     def add_film(self, title, year, duration, genre_id):
-        cur = self.conn.cursor()
-        cur.execute("INSERT INTO films (title, year, duration, genre) VALUES (?, ?, ?, ?)",
-                    (title, year, duration, genre_id))
-        self.conn.commit()
+        return self.writer.submit(self.write_add_film, title, year, duration, genre_id)
 
     def update_film(self, film_id, title, year, duration, genre_id):
-        cur = self.conn.cursor()
-        cur.execute("UPDATE films SET title=?, year=?, duration=?, genre=? WHERE id=?",
-                    (title, year, duration, genre_id, film_id))
-        self.conn.commit()
+        return self.writer.submit(self.write_update_film, film_id, title, year, duration, genre_id)
 
     def delete_film(self, film_id):
+        return self.writer.submit(self.write_delete_film, film_id)
+
+    @staticmethod
+    def write_add_film(conn, title, year, duration, genre_id):
+        cur = conn.execute("INSERT INTO films (title, year, duration, genre) VALUES (?, ?, ?, ?)",
+                           (title, year, duration, genre_id))
+        return conn.execute(FILMS_QUERY + " WHERE f.id = ?", (cur.lastrowid,)).fetchone()
+
+    @staticmethod
+    def write_update_film(conn, film_id, title, year, duration, genre_id):
+        cur = conn.execute("UPDATE films SET title=?, year=?, duration=?, genre=? WHERE id=?",
+                           (title, year, duration, genre_id, film_id))
+        if cur.rowcount == 0:
+            raise LookupError(f"Фильм {film_id} не найден")
+        return conn.execute(FILMS_QUERY + " WHERE f.id = ?", (film_id,)).fetchone()
+
+    @staticmethod
+    def write_delete_film(conn, film_id):
+        conn.execute("DELETE FROM films WHERE id=?", (film_id,))
+
+    def import_films(self, films, progress=None, batch_size=IMPORT_BATCH_SIZE):
+        films = iter(films)
+        count = 0
+        try:
+            with self.conn:
+                cur = self.conn.cursor()
+                self.load_genres()
+                while batch := list(islice(films, batch_size)):
+                    rows = []
+                    for number, film in enumerate(batch, count + 1):
+                        try:
+                            title = str(film["title"]).strip()
+                            genre = str(film["genre"]).strip()
+                            year = int(film["year"])
+                            duration = int(film["duration"])
+                        except (KeyError, TypeError, ValueError) as e:
+                            raise ValueError(f"Запись {number}: некорректное значение {e}")
+                        if not title or not genre:
+                            raise ValueError(f"Запись {number}: пустое название или жанр")
+                        genre_id = self.genre_ids.get(genre)
+                        if genre_id is None:
+                            cur.execute("INSERT INTO genres (title) VALUES (?)", (genre,))
+                            genre_id = self.genre_ids[genre] = cur.lastrowid
+                        rows.append((title, year, duration, genre_id))
+                    cur.executemany("INSERT INTO films (title, year, duration, genre) VALUES (?, ?, ?, ?)", rows)
+                    count += len(rows)
+                    if progress:
+                        progress(count)
+        finally:
+            self.invalidate_genres()
+        return count
+
+    def iter_films(self):
         cur = self.conn.cursor()
-        cur.execute("DELETE FROM films WHERE id=?", (film_id,))
-        self.conn.commit()
+        cur.execute(FILMS_QUERY + " ORDER BY f.id")
+        for row in cur:
+            yield {name: row[name] for name in COLUMNS}
 
     def close(self):
+        self.writer.close()
         self.conn.close()
 
 
+def file_format(path, fmt=None):
+    return fmt or ("json" if path.lower().endswith(".json") else "csv")
+
+
+def read_films(path, fmt=None):
+    with open(path, encoding="utf-8", newline="") as f:
+        if file_format(path, fmt) == "json":
+            yield from json.load(f)
+        else:
+            yield from csv.DictReader(f)
+
+
+def export_csv(films, f):
+    writer = csv.DictWriter(f, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(films)
+
+
+def export_json(films, f):
+    f.write("[")
+    for i, film in enumerate(films):
+        f.write(",\n " if i else "\n ")
+        json.dump(film, f, ensure_ascii=False)
+    f.write("\n]\n")
+
+
+def write_films(films, path, fmt=None):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if file_format(path, fmt) == "json":
+            export_json(films, f)
+        else:
+            export_csv(films, f)
+
+
+class FilmTableModel(QAbstractTableModel):
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.columns = COLUMNS
+        self.rows = []
+        self.exhausted = False
+        self.sort_column = "title"
+        self.descending = False
+        self.filters = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return str(self.rows[index.row()][self.columns[index.column()]])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.columns[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        after = None
+        if self.rows:
+            after = self.sort_key(self.rows[-1])
+        page = self.db.get_films_page(after, sort=self.sort_column, descending=self.descending, filters=self.filters)
+        if len(page) < PAGE_SIZE:
+            self.exhausted = True
+        if not page:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def film_at(self, row):
+        return self.rows[row]
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sort_column = self.columns[column]
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self.refresh()
+
+    def set_filters(self, filters):
+        self.filters = filters
+        self.refresh()
+
+    def sort_key(self, film):
+        return tuple(film[field] for _, field in SORT_COLUMNS[self.sort_column])
+
+    def position(self, key):
+        lo, hi = 0, len(self.rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = self.sort_key(self.rows[mid])
+            if (current > key) if self.descending else (current < key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find_row(self, film):
+        key = self.sort_key(film)
+        pos = self.position(key)
+        if pos < len(self.rows) and self.sort_key(self.rows[pos]) == key:
+            return pos
+        return -1
+
+    def matches(self, film):
+        title = self.filters.get("title")
+        if title and title.translate(ASCII_LOWER) not in film["title"].translate(ASCII_LOWER):
+            return False
+        return all(self.filters.get(name) is None or test(film, self.filters[name])
+                   for name, test in FILTER_TESTS.items())
+
+    def insert_film(self, film):
+        if not self.matches(film):
+            return -1
+        pos = self.position(self.sort_key(film))
+        if pos < len(self.rows) and self.sort_key(self.rows[pos]) == self.sort_key(film):
+            self.rows[pos] = film
+            self.dataChanged.emit(self.index(pos, 0), self.index(pos, self.columnCount() - 1))
+            return pos
+        if pos == len(self.rows) and not self.exhausted:
+            return -1
+        self.beginInsertRows(QModelIndex(), pos, pos)
+        self.rows.insert(pos, film)
+        self.endInsertRows()
+        return pos
+
+    def remove_film(self, film):
+        pos = self.find_row(film)
+        if pos == -1:
+            return
+        self.beginRemoveRows(QModelIndex(), pos, pos)
+        del self.rows[pos]
+        self.endRemoveRows()
+
+    def replace_film(self, old, new):
+        pos = self.find_row(old)
+        if pos != -1 and self.sort_key(old) == self.sort_key(new) and self.matches(new):
+            self.rows[pos] = new
+            self.dataChanged.emit(self.index(pos, 0), self.index(pos, self.columnCount() - 1))
+            return pos
+        self.remove_film(old)
+        return self.insert_film(new)
+
+    def refresh(self):
+        self.beginResetModel()
+        self.rows = []
+        self.exhausted = False
+        self.endResetModel()
+
+
 class FilmFormDialog(QDialog):
     def __init__(self, genres, film_data=None, parent=None):
         super().__init__(parent)
@@ -119,52 +452,96 @@ class MainWindow(QMainWindow):
         super().__init__()
         uic.loadUi("ui/films.ui", self)
         self.db = FilmDatabaseManager(db_path)
+        self.model = FilmTableModel(self.db, self)
+        self.tableView.setModel(self.model)
         self.btnAdd.clicked.connect(self.add_film)
         self.btnEdit.clicked.connect(self.edit_film)
         self.btnDelete.clicked.connect(self.delete_film)
-        self.tableWidget.selectionModel().selectionChanged.connect(self.on_selection_changed)
+        self.btnImport.clicked.connect(self.import_films)
+        self.btnExport.clicked.connect(self.export_films)
+        self.pending = {}
+        self.next_temp_id = -1
+        self.db.writer.writeFinished.connect(self.on_write_finished)
+        self.db.writer.writeFailed.connect(self.on_write_failed)
+        self.tableView.selectionModel().selectionChanged.connect(self.on_selection_changed)
+        header = self.tableView.horizontalHeader()
+        header.setStretchLastSection(True)
+        header.setResizeContentsPrecision(PAGE_SIZE)
+        for i in range(self.model.columnCount() - 1):
+            header.setSectionResizeMode(i, header.ResizeMode.ResizeToContents)
+        header.setSortIndicator(self.model.columns.index("title"), Qt.SortOrder.AscendingOrder)
+        self.tableView.setSortingEnabled(True)
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self.filter_timer.timeout.connect(self.apply_filters)
+        self.titleFilter.textChanged.connect(self.filter_timer.start)
+        for spin in (self.yearFrom, self.yearTo, self.durationFrom, self.durationTo):
+            spin.valueChanged.connect(self.filter_timer.start)
+        self.genreFilter.currentIndexChanged.connect(self.apply_filters)
+        self.btnResetFilters.clicked.connect(self.reset_filters)
         self.load_data()
 
     def load_data(self):
-        films = self.db.get_films_with_genres()
-        columns = self.db.get_column_names()
-        self.tableWidget.setRowCount(len(films))
-        self.tableWidget.setColumnCount(len(columns))
-        self.tableWidget.setHorizontalHeaderLabels(columns)
-        for row_idx, film in enumerate(films):
-            for col_idx, col_name in enumerate(columns):
-                item = QTableWidgetItem(str(film[col_name]))
-                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                self.tableWidget.setItem(row_idx, col_idx, item)
-        header = self.tableWidget.horizontalHeader()
-        header.setStretchLastSection(True)
-        for i in range(len(columns) - 1):
-            header.setSectionResizeMode(i, header.ResizeMode.ResizeToContents)
+        self.update_facets()
+        self.model.refresh()
+        self.on_selection_changed()
+
+    def get_filters(self):
+        filters = {"title": self.titleFilter.text().strip(), "genre_id": self.genreFilter.currentData()}
+        for name, spin in (("year_from", self.yearFrom), ("year_to", self.yearTo),
+                           ("duration_from", self.durationFrom), ("duration_to", self.durationTo)):
+            filters[name] = spin.value() if spin.value() != spin.minimum() else None
+        return filters
+
+    def update_facets(self):
+        filters = self.get_filters()
+        facets = self.db.get_genre_facets(filters)
+        total = sum(row["films"] for row in facets)
+        self.genreFilter.blockSignals(True)
+        self.genreFilter.clear()
+        self.genreFilter.addItem(f"Все жанры ({total})", None)
+        for row in facets:
+            self.genreFilter.addItem(f"{row['title']} ({row['films']})", row["id"])
+        index = self.genreFilter.findData(filters["genre_id"])
+        self.genreFilter.setCurrentIndex(max(index, 0))
+        self.genreFilter.blockSignals(False)
+        counts = {row["id"]: row["films"] for row in facets}
+        self.statusBar().showMessage(f"Найдено фильмов: {counts.get(self.genreFilter.currentData(), total)}")
+
+    def apply_filters(self):
+        self.filter_timer.stop()
+        self.update_facets()
+        self.model.set_filters(self.get_filters())
+        self.on_selection_changed()
+
+    def reset_filters(self):
+        for widget in (self.titleFilter, self.yearFrom, self.yearTo, self.durationFrom, self.durationTo, self.genreFilter):
+            widget.blockSignals(True)
+        self.titleFilter.clear()
+        for spin in (self.yearFrom, self.yearTo, self.durationFrom, self.durationTo):
+            spin.setValue(spin.minimum())
+        self.genreFilter.setCurrentIndex(0)
+        for widget in (self.titleFilter, self.yearFrom, self.yearTo, self.durationFrom, self.durationTo, self.genreFilter):
+            widget.blockSignals(False)
+        self.apply_filters()
 
     def on_selection_changed(self):
-        has_sel = bool(self.tableWidget.selectionModel().selectedRows())
+        has_sel = bool(self.tableView.selectionModel().selectedRows())
         self.btnEdit.setEnabled(has_sel)
         self.btnDelete.setEnabled(has_sel)
 
+    def select_row(self, row):
+        if row == -1:
+            return
+        self.tableView.selectRow(row)
+        self.tableView.scrollTo(self.model.index(row, 0))
+
     def get_selected_film(self):
-        rows = self.tableWidget.selectionModel().selectedRows()
+        rows = self.tableView.selectionModel().selectedRows()
         if not rows:
             return None
-        row = rows[0].row()
-        columns = self.db.get_column_names()
-        film = {}
-        for i, col in enumerate(columns):
-            val = self.tableWidget.item(row, i).text()
-            try:
-                film[col] = int(val)
-            except ValueError:
-                film[col] = val
-        cur = self.db.conn.cursor()
-        cur.execute("SELECT genre FROM films WHERE id=?", (film["id"],))
-        res = cur.fetchone()
-        if res:
-            film["genre_id"] = res[0]
-        return film
+        return dict(self.model.film_at(rows[0].row()))
 
     def add_film(self):
         genres = self.db.get_all_genres()
@@ -184,18 +561,20 @@ class MainWindow(QMainWindow):
             if duration <= 0:
                 QMessageBox.warning(self, "Длительность должна быть положительной.")
                 return
-            try:
-                self.db.add_film(title, year, duration, genre_id)
-                self.load_data()
-                QMessageBox.information(self, "Фильм успешно добавлен.")
-            except Exception as e:
-                QMessageBox.critical(self, f"Не удалось добавить фильм:\n{e}")
+            film = self.make_film(self.next_temp_id, title, year, duration, genre_id)
+            self.next_temp_id -= 1
+            self.select_row(self.model.insert_film(film))
+            job_id = self.db.add_film(title, year, duration, genre_id)
+            self.pending[job_id] = (None, film, "Не удалось добавить фильм")
 
     def edit_film(self):
         film = self.get_selected_film()
         if not film:
             QMessageBox.warning(self, "Выберите фильм для редактирования.")
             return
+        if self.is_saving(film["id"]):
+            QMessageBox.warning(self, "Подождите", "Фильм ещё сохраняется.")
+            return
 
         genres = self.db.get_all_genres()
         if not genres:
@@ -214,18 +593,19 @@ class MainWindow(QMainWindow):
             if duration <= 0:
                 QMessageBox.warning(self, "Длительность должна быть положительной.")
                 return
-            try:
-                self.db.update_film(film["id"], title, year, duration, genre_id)
-                self.load_data()
-                QMessageBox.information(self, "Фильм успешно обновлён.")
-            except Exception as e:
-                QMessageBox.critical(self, f"Не удалось обновить фильм:\n{e}")
+            updated = self.make_film(film["id"], title, year, duration, genre_id)
+            self.select_row(self.model.replace_film(film, updated))
+            job_id = self.db.update_film(film["id"], title, year, duration, genre_id)
+            self.pending[job_id] = (film, updated, "Не удалось обновить фильм")
 
     def delete_film(self):
         film = self.get_selected_film()
         if not film:
             QMessageBox.warning(self, "Выберите фильм для удаления.")
             return
+        if self.is_saving(film["id"]):
+            QMessageBox.warning(self, "Подождите", "Фильм ещё сохраняется.")
+            return
         reply = QMessageBox.question(
             self,
             "Подтверждение",
@@ -234,24 +614,120 @@ class MainWindow(QMainWindow):
             QMessageBox.StandardButton.No
         )
         if reply == QMessageBox.StandardButton.Yes:
-            try:
-                self.db.delete_film(film["id"])
-                self.load_data()
-                QMessageBox.information(self, "Фильм успешно удалён.")
-            except Exception as e:
-                QMessageBox.critical(self, f"Не удалось удалить фильм:\n{e}")
+            self.model.remove_film(film)
+            job_id = self.db.delete_film(film["id"])
+            self.pending[job_id] = (film, None, "Не удалось удалить фильм")
+
+    def is_saving(self, film_id):
+        return film_id < 0 or any(film["id"] == film_id
+                                  for before, after, _ in self.pending.values() for film in (before, after) if film)
+
+    def make_film(self, film_id, title, year, duration, genre_id):
+        return {"id": film_id, "title": title, "year": year, "duration": duration,
+                "genre": self.db.genre_title(genre_id), "genre_id": genre_id}
+
+    def on_write_finished(self, job_id, result):
+        if job_id not in self.pending:
+            return
+        _, after, _ = self.pending.pop(job_id)
+        if after is not None and result is not None:
+            selected = self.get_selected_film()
+            row = self.model.replace_film(after, result)
+            if selected and selected["id"] == after["id"]:
+                self.select_row(row)
+        self.update_facets()
+
+    def on_write_failed(self, job_id, message):
+        if job_id not in self.pending:
+            return
+        before, after, text = self.pending.pop(job_id)
+        current = self.db.get_film(before["id"]) if before is not None else None
+        if after is None:
+            if current is not None:
+                self.model.insert_film(current)
+        elif current is None:
+            self.model.remove_film(after)
+        else:
+            self.model.replace_film(after, current)
+        self.update_facets()
+        QMessageBox.critical(self, "Ошибка", f"{text}:\n{message}")
+
+    def import_films(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт фильмов", "", "CSV (*.csv);;JSON (*.json)")
+        if not path:
+            return
+        progress = QProgressDialog("Импорт фильмов...", None, 0, 0, self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.show()
+
+        def report(count):
+            progress.setLabelText(f"Импортировано фильмов: {count}")
+            QApplication.processEvents()
+
+        try:
+            count = self.db.import_films(read_films(path), report)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось импортировать фильмы:\n{e}")
+            return
+        finally:
+            progress.close()
+        self.load_data()
+        QMessageBox.information(self, "Импорт", f"Импортировано фильмов: {count}")
+
+    def export_films(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт фильмов", "films.csv", "CSV (*.csv);;JSON (*.json)")
+        if not path:
+            return
+        try:
+            write_films(self.db.iter_films(), path)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось экспортировать фильмы:\n{e}")
+            return
+        QMessageBox.information(self, "Экспорт", "Фильмы успешно экспортированы.")
 
     def closeEvent(self, event):
         self.db.close()
         event.accept()
 
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Редактор базы данных с фильмами")
+    parser.add_argument("--db", default=DB_FILE)
+    commands = parser.add_subparsers(dest="command")
+    import_parser = commands.add_parser("import", help="загрузить фильмы из CSV/JSON")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--format", choices=("csv", "json"))
+    export_parser = commands.add_parser("export", help="выгрузить фильмы в CSV/JSON")
+    export_parser.add_argument("file", nargs="?", help="файл для экспорта (по умолчанию stdout)")
+    export_parser.add_argument("--format", choices=("csv", "json"))
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"Файл базы данных '{args.db}' не найден.", file=sys.stderr)
+        return 1
+    if args.command is None:
+        app = QApplication(sys.argv)
+        window = MainWindow(args.db)
+        window.show()
+        return app.exec()
+    db = FilmDatabaseManager(args.db)
+    try:
+        if args.command == "import":
+            count = db.import_films(read_films(args.file, args.format),
+                                    lambda count: print(f"Импортировано фильмов: {count}", file=sys.stderr))
+            print(f"Готово, добавлено фильмов: {count}")
+        elif args.file:
+            write_films(db.iter_films(), args.file, args.format)
+        elif args.format == "json":
+            export_json(db.iter_films(), sys.stdout)
+        else:
+            export_csv(db.iter_films(), sys.stdout)
+    except Exception as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    return 0
+
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    db_file = "resources/films_db.sqlite"
-    if not os.path.exists(db_file):
-        QMessageBox.critical(None, "Файл базы данных '{db_file}' не найден в текущей папке.")
-        sys.exit(1)
-
-    window = MainWindow(db_file)
-    window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
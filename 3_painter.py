@@ -1,71 +1,534 @@
 import sys
+import mmap
 import random
-from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QWidget, QMessageBox
-from PyQt6.QtCore import Qt, QPoint
-from PyQt6.QtGui import QPainter, QColor, QPen, QPolygon, QCursor
+import struct
+from array import array
+from bisect import bisect_left
+from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QWidget, QMessageBox, QFileDialog
+from PyQt6.QtCore import Qt, QPoint, QRect, QRectF, QTimer
+from PyQt6.QtGui import QPainter, QColor, QPen, QPolygon, QCursor, QImage, QRegion, QAction, QKeySequence
 
+PEN_WIDTH = 2
+WORLD_BOX = (-32768, -32768, 32768, 32768)
+QUADTREE_CAPACITY = 16
+QUADTREE_MAX_DEPTH = 12
+SHAPE_TYPES = ['circle', 'square', 'triangle']
+SHAPE_CODES = {name: code for code, name in enumerate(SHAPE_TYPES)}
+FILE_MAGIC = b"SHP1"
+FILE_HEADER = struct.Struct("<4sQ")
+FILE_ALIGNMENT = 8
+FRAME_INTERVAL_MS = 16
+CHECKPOINT_INTERVAL = 500
+HISTORY_BUDGET_BYTES = 64 * 1024 * 1024
+UNDO_ENTRY_BYTES = 64
+
+
+def rect_box(rect):
+    return rect.x(), rect.y(), rect.x() + rect.width(), rect.y() + rect.height()
+
+
+def uncovered_rects(size, covered):
+    rects = []
+    if size.width() > covered.width():
+        rects.append(QRect(covered.width(), 0, size.width() - covered.width(), size.height()))
+    if size.height() > covered.height():
+        rects.append(QRect(0, covered.height(), min(size.width(), covered.width()), size.height() - covered.height()))
+    return rects
+
+
+def boxes_intersect(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def box_contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+
+class QuadTree:
+    def __init__(self, bounds, box=WORLD_BOX, depth=0):
+        self.bounds = bounds
+        self.box = box
+        self.depth = depth
+        self.items = array('i')
+        self.children = None
+
+    def insert(self, item, box=None):
+        if box is None:
+            box = self.bounds(item)
+        if self.children is not None:
+            for child in self.children:
+                if box_contains(child.box, box):
+                    child.insert(item, box)
+                    return
+        self.items.append(item)
+        if self.children is None and len(self.items) > QUADTREE_CAPACITY and self.depth < QUADTREE_MAX_DEPTH:
+            self.split()
+
+    def split(self):
+        left, top, right, bottom = self.box
+        mid_x, mid_y = (left + right) // 2, (top + bottom) // 2
+        self.children = [
+            QuadTree(self.bounds, (left, top, mid_x, mid_y), self.depth + 1),
+            QuadTree(self.bounds, (mid_x, top, right, mid_y), self.depth + 1),
+            QuadTree(self.bounds, (left, mid_y, mid_x, bottom), self.depth + 1),
+            QuadTree(self.bounds, (mid_x, mid_y, right, bottom), self.depth + 1),
+        ]
+        items, self.items = self.items, array('i')
+        for item in items:
+            self.insert(item)
+
+    def query(self, box, found=None):
+        if found is None:
+            found = []
+        for item in self.items:
+            if boxes_intersect(self.bounds(item), box):
+                found.append(item)
+        if self.children is not None:
+            for child in self.children:
+                if boxes_intersect(child.box, box):
+                    child.query(box, found)
+        return found
+
+    def truncate(self, count):
+        del self.items[bisect_left(self.items, count):]
+        if self.children is not None:
+            for child in self.children:
+                child.truncate(count)
+
+
+class ShapeStore:
+    COLUMNS = (('types', 'B'), ('xs', 'i'), ('ys', 'i'), ('sizes', 'i'), ('colors', 'I'))
 
-class DrawingWidget(QWidget):
     def __init__(self):
+        for name, typecode in self.COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(self.types)
+
+    def nbytes(self):
+        return sum(column.itemsize * len(column) for column in (getattr(self, name) for name, _ in self.COLUMNS))
+
+    def truncate(self, count):
+        removed = ShapeStore()
+        for name, _ in self.COLUMNS:
+            column = getattr(self, name)
+            getattr(removed, name).extend(column[count:])
+            del column[count:]
+        return removed
+
+    def extend(self, other):
+        for name, _ in self.COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+
+    def append(self, shape_type, x, y, size, rgba):
+        self.types.append(shape_type)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.sizes.append(size)
+        self.colors.append(rgba)
+
+    def bounds(self, i):
+        x, y, half = self.xs[i], self.ys[i], self.sizes[i] // 2
+        margin = PEN_WIDTH
+        return x - half - margin, y - half - margin, x + half + margin + 1, y + half + margin + 1
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(FILE_HEADER.pack(FILE_MAGIC, len(self)))
+            for name, _ in self.COLUMNS:
+                column = getattr(self, name)
+                if sys.byteorder != 'little':
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                f.write(column.tobytes())
+                f.write(bytes(-f.tell() % FILE_ALIGNMENT))
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            magic, count = FILE_HEADER.unpack_from(view)
+            if magic != FILE_MAGIC:
+                raise ValueError("Неверный формат файла")
+            offset = FILE_HEADER.size
+            for name, _ in cls.COLUMNS:
+                column = getattr(store, name)
+                end = offset + count * column.itemsize
+                if end > len(view):
+                    raise ValueError("Файл рисунка повреждён")
+                column.frombytes(view[offset:end])
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                offset = end + (-end % FILE_ALIGNMENT)
+        return store
+
+
+class DrawingHistory:
+    def __init__(self, budget=HISTORY_BUDGET_BYTES):
+        self.budget = budget
+        self.undo_stack = []
+        self.redo_stack = []
+        self.checkpoints = []
+        self.bytes = 0
+        self.group_open = False
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.checkpoints.clear()
+        self.bytes = 0
+        self.group_open = False
+
+    def record(self, start, stop):
+        self.clear_redo()
+        if self.group_open and self.undo_stack and self.undo_stack[-1][1] == start:
+            self.undo_stack[-1][1] = stop
+        else:
+            self.push_undo(start, stop)
+        self.enforce_budget()
+
+    def push_undo(self, start, stop):
+        self.undo_stack.append([start, stop])
+        self.bytes += UNDO_ENTRY_BYTES
+
+    def pop_undo(self):
+        self.bytes -= UNDO_ENTRY_BYTES
+        return self.undo_stack.pop()
+
+    def push_redo(self, store):
+        self.redo_stack.append(store)
+        self.bytes += store.nbytes()
+
+    def pop_redo(self):
+        store = self.redo_stack.pop()
+        self.bytes -= store.nbytes()
+        return store
+
+    def clear_redo(self):
+        self.bytes -= sum(store.nbytes() for store in self.redo_stack)
+        self.redo_stack.clear()
+
+    def add_checkpoint(self, count, image):
+        if self.checkpoints and self.checkpoints[-1][0] == count:
+            self.pop_checkpoint(-1)
+        self.checkpoints.append((count, image))
+        self.bytes += image.sizeInBytes()
+        self.enforce_budget()
+
+    def pop_checkpoint(self, i):
+        _, image = self.checkpoints.pop(i)
+        self.bytes -= image.sizeInBytes()
+
+    def clear_checkpoints(self):
+        while self.checkpoints:
+            self.pop_checkpoint(-1)
+
+    def last_checkpoint_count(self):
+        return self.checkpoints[-1][0] if self.checkpoints else 0
+
+    def checkpoint_before(self, count):
+        for checkpoint in reversed(self.checkpoints):
+            if checkpoint[0] <= count:
+                return checkpoint
+        return None
+
+    def drop_checkpoints_after(self, count):
+        while self.checkpoints and self.checkpoints[-1][0] > count:
+            self.pop_checkpoint(-1)
+
+    def drop_unreachable_checkpoints(self):
+        if self.undo_stack:
+            oldest = self.undo_stack[0][0]
+            while len(self.checkpoints) > 1 and self.checkpoints[1][0] <= oldest:
+                self.pop_checkpoint(0)
+
+    def enforce_budget(self):
+        while self.bytes > self.budget:
+            if len(self.redo_stack) > 1:
+                store = self.redo_stack.pop(0)
+                self.bytes -= store.nbytes()
+            elif len(self.undo_stack) > 1:
+                self.undo_stack.pop(0)
+                self.bytes -= UNDO_ENTRY_BYTES
+                self.drop_unreachable_checkpoints()
+            elif len(self.checkpoints) > 1:
+                self.pop_checkpoint(0)
+            else:
+                break
+
+
+def paint_shape(painter, store, i):
+    shape_type = store.types[i]
+    x, y = store.xs[i], store.ys[i]
+    size = store.sizes[i]
+    color = QColor.fromRgba(store.colors[i])
+    painter.setPen(QPen(color, PEN_WIDTH))
+    painter.setBrush(color)
+    if shape_type == SHAPE_CODES['circle']:
+        painter.drawEllipse(x - size // 2, y - size // 2, size, size)
+    elif shape_type == SHAPE_CODES['square']:
+        painter.drawRect(x - size // 2, y - size // 2, size, size)
+    elif shape_type == SHAPE_CODES['triangle']:
+        height = int(size * 0.866)
+        points = QPolygon([
+            QPoint(x, y - height // 2),
+            QPoint(x - size // 2, y + height // 2),
+            QPoint(x + size // 2, y + height // 2)
+        ])
+        painter.drawPolygon(points)
+
+
+class DrawingWidget(QWidget):
+    def __init__(self, history_budget=HISTORY_BUDGET_BYTES):
         super().__init__()
-        self.shapes = []
+        self.shapes = ShapeStore()
+        self.history = DrawingHistory(history_budget)
+        self.index = None
+        self.layer = None
+        self.pending = []
+        self.stroke_mode = False
+        self.held_keys = set()
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setInterval(FRAME_INTERVAL_MS)
+        self.frame_timer.timeout.connect(self.on_frame)
         self.setMinimumSize(400, 300)
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
 
     def add_shape(self, shape_info):
-        self.shapes.append(shape_info)
+        self.add_shapes([shape_info])
+
+    def add_shapes(self, shapes):
+        start = len(self.shapes)
+        for shape_info in shapes:
+            x, y = shape_info['pos']
+            self.shapes.append(SHAPE_CODES[shape_info['type']], x, y, shape_info['size'], shape_info['color'].rgba())
+        stop = len(self.shapes)
+        if start == stop:
+            return
+        self.history.record(start, stop)
+        self.commit_range(start, stop)
+
+    def commit_range(self, start, stop):
+        if self.index is not None:
+            for i in range(start, stop):
+                self.index.insert(i)
+        if self.layer is not None:
+            painter = self.layer_painter()
+            for i in range(start, stop):
+                paint_shape(painter, self.shapes, i)
+            painter.end()
+            if stop - self.history.last_checkpoint_count() >= CHECKPOINT_INTERVAL:
+                self.history.add_checkpoint(stop, self.layer.copy())
+        boxes = [self.shapes.bounds(i) for i in range(start, stop)]
+        left = min(box[0] for box in boxes)
+        top = min(box[1] for box in boxes)
+        right = max(box[2] for box in boxes)
+        bottom = max(box[3] for box in boxes)
+        self.update(QRect(left, top, right - left, bottom - top))
+
+    def undo(self):
+        self.flush_pending()
+        if not self.history.undo_stack:
+            return
+        start, _ = self.history.pop_undo()
+        self.history.push_redo(self.shapes.truncate(start))
+        if self.index is not None:
+            self.index.truncate(start)
+        if self.layer is not None:
+            self.history.drop_checkpoints_after(start)
+            checkpoint = self.history.checkpoint_before(start)
+            painter = self.layer_painter()
+            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+            painter.fillRect(self.layer.rect(), Qt.GlobalColor.transparent)
+            replay_from = 0
+            if checkpoint is not None:
+                replay_from, image = checkpoint
+                painter.drawImage(QPoint(0, 0), image)
+            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+            if checkpoint is not None:
+                exposed = uncovered_rects(self.size(), image.deviceIndependentSize().toSize())
+                if exposed:
+                    painter.setClipRegion(self.region_of(exposed))
+                    for i in self.shapes_in(exposed):
+                        if i < replay_from:
+                            paint_shape(painter, self.shapes, i)
+                    painter.setClipping(False)
+            for i in range(replay_from, start):
+                paint_shape(painter, self.shapes, i)
+            painter.end()
+        self.history.enforce_budget()
         self.update()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def redo(self):
+        self.flush_pending()
+        if not self.history.redo_stack:
+            return
+        start = len(self.shapes)
+        self.shapes.extend(self.history.pop_redo())
+        self.history.push_undo(start, len(self.shapes))
+        self.commit_range(start, len(self.shapes))
+
+    def set_stroke_mode(self, enabled):
+        self.stroke_mode = enabled
+        self.held_keys.clear()
+        self.end_stroke()
+
+    def begin_stroke(self):
+        if self.stroke_mode:
+            self.flush_pending()
+            self.history.group_open = True
+
+    def end_stroke(self):
+        self.flush_pending()
+        self.history.group_open = False
+
+    def flush_pending(self):
+        if self.pending:
+            pending, self.pending = self.pending, []
+            self.add_shapes(pending)
+
+    def schedule_frame(self):
+        if not self.frame_timer.isActive():
+            self.frame_timer.start()
+
+    def on_frame(self):
+        if self.stroke_mode and Qt.Key.Key_Space in self.held_keys:
+            self.pending.append(self.make_shape('triangle', self.mapFromGlobal(QCursor.pos())))
+        self.flush_pending()
+        if not (self.stroke_mode and self.held_keys):
+            self.frame_timer.stop()
+
+    def set_shapes(self, shapes):
+        self.pending = []
+        self.shapes = shapes
+        self.history.clear()
+        self.index = None
+        self.layer = None
+        self.update()
+
+    def save(self, path):
+        self.shapes.save(path)
+
+    def load(self, path):
+        self.set_shapes(ShapeStore.load(path))
+
+    def ensure_index(self):
+        if self.index is None:
+            self.index = QuadTree(self.shapes.bounds)
+            for i in range(len(self.shapes)):
+                self.index.insert(i)
+        return self.index
+
+    def layer_painter(self):
+        painter = QPainter(self.layer)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        return painter
 
-        for shape_info in self.shapes:
-            shape_type = shape_info['type']
-            x, y = shape_info['pos']
-            size = shape_info['size']
-            color = shape_info['color']
-            painter.setPen(QPen(color, 2))
-            painter.setBrush(color)
-            if shape_type == 'circle':
-                painter.drawEllipse(x - size // 2, y - size // 2, size, size)
-            elif shape_type == 'square':
-                painter.drawRect(x - size // 2, y - size // 2, size, size)
-            elif shape_type == 'triangle':
-                height = int(size * 0.866)
-                points = QPolygon([
-                    QPoint(x, y - height // 2),
-                    QPoint(x - size // 2, y + height // 2),
-                    QPoint(x + size // 2, y + height // 2)
-                ])
-                painter.drawPolygon(points)
+    def ensure_layer(self):
+        dpr = self.devicePixelRatioF()
+        size = self.size()
+        old = self.layer
+        if old is not None and old.devicePixelRatio() == dpr and old.deviceIndependentSize().toSize() == size:
+            return
+        self.layer = QImage(size * dpr, QImage.Format.Format_ARGB32_Premultiplied)
+        self.layer.setDevicePixelRatio(dpr)
+        self.layer.fill(Qt.GlobalColor.transparent)
+        painter = self.layer_painter()
+        if old is None or old.devicePixelRatio() != dpr:
+            self.history.clear_checkpoints()
+            for i in range(len(self.shapes)):
+                paint_shape(painter, self.shapes, i)
+        else:
+            painter.drawImage(QPoint(0, 0), old)
+            exposed = uncovered_rects(size, old.deviceIndependentSize().toSize())
+            if exposed:
+                painter.setClipRegion(self.region_of(exposed))
+                for i in self.shapes_in(exposed):
+                    paint_shape(painter, self.shapes, i)
+        painter.end()
+        if len(self.shapes):
+            self.history.add_checkpoint(len(self.shapes), self.layer.copy())
+
+    @staticmethod
+    def region_of(rects):
+        region = QRegion()
+        for rect in rects:
+            region = region.united(rect)
+        return region
+
+    def shapes_in(self, rects):
+        index = self.ensure_index()
+        found = set()
+        for rect in rects:
+            found.update(index.query(rect_box(rect)))
+        return sorted(found)
+
+    def paintEvent(self, event):
+        self.ensure_layer()
+        rect = event.rect()
+        dpr = self.layer.devicePixelRatio()
+        source = QRectF(rect.x() * dpr, rect.y() * dpr, rect.width() * dpr, rect.height() * dpr)
+        painter = QPainter(self)
+        painter.drawImage(QRectF(rect), self.layer, source)
 
     def mousePressEvent(self, event):
         self.setFocus(Qt.FocusReason.MouseFocusReason)
         local_pos = event.position().toPoint()
+        self.begin_stroke()
         if event.button() == Qt.MouseButton.LeftButton:
             self.draw_shape('circle', local_pos)
         elif event.button() == Qt.MouseButton.RightButton:
             self.draw_shape('square', local_pos)
 
+    def mouseReleaseEvent(self, event):
+        if not event.buttons():
+            self.end_stroke()
+
+    def mouseMoveEvent(self, event):
+        if not self.stroke_mode:
+            return
+        local_pos = event.position().toPoint()
+        if event.buttons() & Qt.MouseButton.LeftButton:
+            self.draw_shape('circle', local_pos)
+        elif event.buttons() & Qt.MouseButton.RightButton:
+            self.draw_shape('square', local_pos)
+
     def keyPressEvent(self, event):
         if event.key() == Qt.Key.Key_Space:
+            if self.stroke_mode:
+                if not event.isAutoRepeat():
+                    self.begin_stroke()
+                    self.held_keys.add(Qt.Key.Key_Space)
+                    self.schedule_frame()
+                return
             global_pos = QCursor.pos()
             local_pos = self.mapFromGlobal(global_pos)
             self.draw_shape('triangle', local_pos)
         else:
             super().keyPressEvent(event)
 
-    def draw_shape(self, shape_type, pos):
-        size = random.randint(20, 100)  
+    def keyReleaseEvent(self, event):
+        if event.key() == Qt.Key.Key_Space and not event.isAutoRepeat():
+            self.held_keys.discard(Qt.Key.Key_Space)
+            self.end_stroke()
+        else:
+            super().keyReleaseEvent(event)
+
+    @staticmethod
+    def make_shape(shape_type, pos):
+        size = random.randint(20, 100)
         color = QColor(random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
-        shape_info = {
+        return {
             'type': shape_type,
             'pos': (pos.x(), pos.y()),
             'size': size,
             'color': color
         }
-        self.add_shape(shape_info)
+
+    def draw_shape(self, shape_type, pos):
+        self.pending.append(self.make_shape(shape_type, pos))
+        self.schedule_frame()
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -77,7 +540,47 @@ class MainWindow(QMainWindow):
         self.drawing_widget = DrawingWidget()
         layout.addWidget(self.drawing_widget)
         self.setCentralWidget(central_widget)
+        file_menu = self.menuBar().addMenu("Файл")
+        open_action = QAction("Открыть…", self)
+        open_action.setShortcut("Ctrl+O")
+        open_action.triggered.connect(self.open_drawing)
+        save_action = QAction("Сохранить…", self)
+        save_action.setShortcut("Ctrl+S")
+        save_action.triggered.connect(self.save_drawing)
+        file_menu.addAction(open_action)
+        file_menu.addAction(save_action)
+        edit_menu = self.menuBar().addMenu("Правка")
+        undo_action = QAction("Отменить", self)
+        undo_action.setShortcut(QKeySequence.StandardKey.Undo)
+        undo_action.triggered.connect(self.drawing_widget.undo)
+        redo_action = QAction("Повторить", self)
+        redo_action.setShortcut(QKeySequence.StandardKey.Redo)
+        redo_action.triggered.connect(self.drawing_widget.redo)
+        edit_menu.addAction(undo_action)
+        edit_menu.addAction(redo_action)
+        stroke_action = QAction("Непрерывное рисование", self)
+        stroke_action.setShortcut("Ctrl+D")
+        stroke_action.setCheckable(True)
+        stroke_action.toggled.connect(self.drawing_widget.set_stroke_mode)
+        edit_menu.addAction(stroke_action)
         print("Нажмите ЛКМ (круг), ПКМ (квадрат) или Пробел (треугольник). Фокус на рисующем поле устанавливается кликом.")
+        print("Ctrl+D включает непрерывное рисование: фигуры появляются, пока кнопка мыши или Пробел удерживаются.")
+
+    def open_drawing(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Открыть рисунок", "", "Рисунки (*.shp)")
+        if path:
+            try:
+                self.drawing_widget.load(path)
+            except (OSError, ValueError, struct.error) as e:
+                QMessageBox.critical(self, "Ошибка", f"Не удалось открыть рисунок:\n{e}")
+
+    def save_drawing(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить рисунок", "", "Рисунки (*.shp)")
+        if path:
+            try:
+                self.drawing_widget.save(path)
+            except OSError as e:
+                QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить рисунок:\n{e}")
 
 def main():
     app = QApplication(sys.argv)
@@ -86,4 +589,4 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
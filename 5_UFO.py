@@ -1,14 +1,79 @@
 import sys
 import os
+import csv
+import time
+import argparse
+from collections import deque
 from PyQt6.QtWidgets import QApplication, QMainWindow, QLabel, QMessageBox
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPixmap, QKeyEvent
+from PyQt6.QtCore import Qt, QTimer, QElapsedTimer
+from PyQt6.QtGui import QPixmap, QKeyEvent, QFont
 from PyQt6 import uic
 from pathlib import Path
 
+SPEED = 600
+FIXED_DT = 1 / 120
+FRAME_INTERVAL_MS = 16
+MAX_FRAME_TIME = 0.25
+DIRECTIONS = {
+    Qt.Key.Key_Left: (-1, 0),
+    Qt.Key.Key_Right: (1, 0),
+    Qt.Key.Key_Up: (0, -1),
+    Qt.Key.Key_Down: (0, 1),
+}
+KEY_NAMES = {
+    Qt.Key.Key_Left: "L",
+    Qt.Key.Key_Right: "R",
+    Qt.Key.Key_Up: "U",
+    Qt.Key.Key_Down: "D",
+}
+NAME_KEYS = {name: key for key, name in KEY_NAMES.items()}
+HUD_KEY = Qt.Key.Key_F3
+HUD_INTERVAL_MS = 250
+STATS_WINDOW = 240
+TRACE_FIELDS = ["frame", "time_ms", "frame_ms", "input_ms", "move_ms", "x", "y", "keys"]
+
+
+class FrameStats:
+    def __init__(self, window=STATS_WINDOW):
+        self.frame_times = deque(maxlen=window)
+        self.input_times = deque(maxlen=window)
+        self.move_times = deque(maxlen=window)
+        self.frames = 0
+
+    def add(self, frame_ms, input_ms, move_ms):
+        self.frame_times.append(frame_ms)
+        self.input_times.append(input_ms)
+        self.move_times.append(move_ms)
+        self.frames += 1
+
+    def fps(self):
+        total = sum(self.frame_times)
+        return len(self.frame_times) * 1000 / total if total else 0.0
+
+    @staticmethod
+    def percentile(values, fraction):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    @staticmethod
+    def mean(values):
+        return sum(values) / len(values) if values else 0.0
+
+    def summary(self):
+        return (
+            f"FPS: {self.fps():.1f}\n"
+            f"кадр p50/p95/p99: {self.percentile(self.frame_times, 0.5):.2f}/"
+            f"{self.percentile(self.frame_times, 0.95):.2f}/"
+            f"{self.percentile(self.frame_times, 0.99):.2f} мс\n"
+            f"ввод: {self.mean(self.input_times):.3f} мс\n"
+            f"move: {self.mean(self.move_times):.3f} мс"
+        )
+
 
 class UFOGameWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, show_hud=False, trace_path=None):
         super().__init__()
         if getattr(sys, 'frozen', False):
             ui_path = os.path.join(sys._MEIPASS, 'ui', 'ufo.ui')
@@ -52,7 +117,30 @@ class UFOGameWindow(QMainWindow):
         self.x_pos = (window_width - ufo_width) // 2
         self.y_pos = (window_height - ufo_height) // 2
         self.ufo_label.move(self.x_pos, self.y_pos)
-        self.step_size = 20
+        self.pressed_keys = set()
+        self.accumulator = 0.0
+        self.running = False
+        self.replaying = False
+        self.clock = QElapsedTimer()
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.frame_timer.setInterval(FRAME_INTERVAL_MS)
+        self.frame_timer.timeout.connect(self.on_frame)
+        self.stats = FrameStats()
+        self.input_ns = 0
+        self.trace_file = None
+        self.trace_writer = None
+        self.trace_clock = QElapsedTimer()
+        self.hud_label = QLabel(self.background_label)
+        self.hud_label.setFont(QFont("Monospace", 9))
+        self.hud_label.setStyleSheet("color: white; background-color: rgba(0, 0, 0, 160); padding: 4px;")
+        self.hud_label.move(5, 5)
+        self.hud_timer = QTimer(self)
+        self.hud_timer.setInterval(HUD_INTERVAL_MS)
+        self.hud_timer.timeout.connect(self.update_hud)
+        self.set_hud_visible(show_hud)
+        if trace_path:
+            self.start_trace(trace_path)
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         self.setFocus()
 
@@ -61,38 +149,155 @@ class UFOGameWindow(QMainWindow):
 
     def keyPressEvent(self, event: QKeyEvent):
         key = event.key()
-        moved = False
-        if key == Qt.Key.Key_Left:
-            self.x_pos -= self.step_size
-            moved = True
-        elif key == Qt.Key.Key_Right:
-            self.x_pos += self.step_size
-            moved = True
-        elif key == Qt.Key.Key_Up:
-            self.y_pos -= self.step_size
-            moved = True
-        elif key == Qt.Key.Key_Down:
-            self.y_pos += self.step_size
-            moved = True
-        if moved:
-            bg_width = self.background_label.width()
-            bg_height = self.background_label.height()
-            ufo_width = self.ufo_label.width()
-            ufo_height = self.ufo_label.height()
-            if self.x_pos < -ufo_width:
-                self.x_pos = bg_width  
-            elif self.x_pos > bg_width:
-                self.x_pos = -ufo_width  
-            if self.y_pos < -ufo_height:
-                self.y_pos = bg_height 
-            elif self.y_pos > bg_height:
-                self.y_pos = -ufo_height
-            self.ufo_label.move(self.x_pos, self.y_pos)
+        if key == HUD_KEY and not event.isAutoRepeat():
+            self.set_hud_visible(not self.hud_label.isVisible())
+            return
+        if key not in DIRECTIONS:
+            super().keyPressEvent(event)
+            return
+        if event.isAutoRepeat():
+            return
+        started = time.perf_counter_ns()
+        self.pressed_keys.add(key)
+        if not self.running:
+            self.running = True
+            self.accumulator = 0.0
+            self.clock.start()
+            if not self.replaying:
+                self.frame_timer.start()
+        self.input_ns += time.perf_counter_ns() - started
+
+    def keyReleaseEvent(self, event: QKeyEvent):
+        key = event.key()
+        if key not in DIRECTIONS:
+            super().keyReleaseEvent(event)
+            return
+        if not event.isAutoRepeat():
+            started = time.perf_counter_ns()
+            self.pressed_keys.discard(key)
+            self.input_ns += time.perf_counter_ns() - started
+
+    def focusOutEvent(self, event):
+        self.pressed_keys.clear()
+        super().focusOutEvent(event)
+
+    def velocity(self):
+        dx = sum(DIRECTIONS[key][0] for key in self.pressed_keys)
+        dy = sum(DIRECTIONS[key][1] for key in self.pressed_keys)
+        if dx and dy:
+            return SPEED * dx * 0.7071, SPEED * dy * 0.7071
+        return SPEED * dx, SPEED * dy
+
+    def on_frame(self, elapsed_ms=None):
+        if elapsed_ms is None:
+            elapsed_ms = self.clock.nsecsElapsed() / 1e6
+            self.clock.start()
+        self.accumulator += min(elapsed_ms / 1000, MAX_FRAME_TIME)
+        started = time.perf_counter_ns()
+        vx, vy = self.velocity()
+        input_ms = (self.input_ns + time.perf_counter_ns() - started) / 1e6
+        self.input_ns = 0
+        while self.accumulator >= FIXED_DT:
+            self.step(vx, vy, FIXED_DT)
+            self.accumulator -= FIXED_DT
+        started = time.perf_counter_ns()
+        self.ufo_label.move(int(self.x_pos), int(self.y_pos))
+        move_ms = (time.perf_counter_ns() - started) / 1e6
+        self.stats.add(elapsed_ms, input_ms, move_ms)
+        if self.trace_writer is not None:
+            self.trace_writer.writerow([
+                self.stats.frames, self.trace_clock.elapsed(), f"{elapsed_ms:.6f}", f"{input_ms:.4f}", f"{move_ms:.4f}",
+                f"{self.x_pos:.2f}", f"{self.y_pos:.2f}", "".join(sorted(KEY_NAMES[key] for key in self.pressed_keys)),
+            ])
+        if not self.pressed_keys:
+            self.frame_timer.stop()
+            self.running = False
+
+    def step(self, vx, vy, dt):
+        self.x_pos += vx * dt
+        self.y_pos += vy * dt
+        bg_width = self.background_label.width()
+        bg_height = self.background_label.height()
+        ufo_width = self.ufo_label.width()
+        ufo_height = self.ufo_label.height()
+        if self.x_pos < -ufo_width:
+            self.x_pos = bg_width
+        elif self.x_pos > bg_width:
+            self.x_pos = -ufo_width
+        if self.y_pos < -ufo_height:
+            self.y_pos = bg_height
+        elif self.y_pos > bg_height:
+            self.y_pos = -ufo_height
+
+    def set_hud_visible(self, visible):
+        self.hud_label.setVisible(visible)
+        if visible:
+            self.update_hud()
+            self.hud_label.raise_()
+            self.hud_timer.start()
+        else:
+            self.hud_timer.stop()
+
+    def update_hud(self):
+        self.hud_label.setText(self.stats.summary())
+        self.hud_label.adjustSize()
+
+    def start_trace(self, path):
+        self.stop_trace()
+        self.trace_file = open(path, 'w', newline='', encoding='utf-8')
+        self.trace_writer = csv.writer(self.trace_file)
+        self.trace_writer.writerow(TRACE_FIELDS)
+        self.trace_clock.start()
+
+    def stop_trace(self):
+        if self.trace_file is not None:
+            self.trace_file.close()
+        self.trace_file = None
+        self.trace_writer = None
+
+    def send_key(self, event_type, key):
+        QApplication.sendEvent(self, QKeyEvent(event_type, key, Qt.KeyboardModifier.NoModifier))
+
+    def replay(self, path):
+        self.frame_timer.stop()
+        self.running = False
+        self.replaying = True
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    keys = {NAME_KEYS[name] for name in row["keys"]}
+                    for key in self.pressed_keys - keys:
+                        self.send_key(QKeyEvent.Type.KeyRelease, key)
+                    for key in keys - self.pressed_keys:
+                        self.send_key(QKeyEvent.Type.KeyPress, key)
+                    self.on_frame(float(row["frame_ms"]))
+                    QApplication.processEvents()
+            for key in list(self.pressed_keys):
+                self.send_key(QKeyEvent.Type.KeyRelease, key)
+        finally:
+            self.replaying = False
+            self.running = False
+
+    def closeEvent(self, event):
+        self.stop_trace()
+        event.accept()
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hud", action="store_true", default=bool(os.environ.get("UFO_HUD")))
+    parser.add_argument("--trace", default=os.environ.get("UFO_TRACE"))
+    parser.add_argument("--replay")
+    args = parser.parse_args()
     app = QApplication(sys.argv)
-    window = UFOGameWindow()
+    window = UFOGameWindow(args.hud, args.trace)
     window.show()
+    if args.replay:
+        started = time.perf_counter()
+        window.replay(args.replay)
+        window.stop_trace()
+        print(f"Кадров: {window.stats.frames}, время: {time.perf_counter() - started:.3f} с")
+        print(window.stats.summary())
+        return
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -1,46 +1,452 @@
-import sys, sqlite3, bcrypt, os
+import sys, sqlite3, bcrypt, os, hashlib, threading, re
+from collections import OrderedDict
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QFormLayout, QLabel, QLineEdit, QPushButton, QMessageBox, QTableWidget,
-    QTableWidgetItem, QHeaderView, QFileDialog, QDialog, QComboBox, QStackedWidget, QSizePolicy
+    QFormLayout, QLabel, QLineEdit, QPushButton, QMessageBox,
+    QHeaderView, QFileDialog, QDialog, QComboBox, QStackedWidget, QSizePolicy,
+    QStyledItemDelegate, QStyle
 )
-from PyQt6.QtGui import QPixmap, QIcon, QIntValidator
-from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPixmap, QIcon, QIntValidator, QImage, QImageReader
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, QAbstractTableModel, QModelIndex, QSize
 from datetime import datetime
 from PyQt6 import uic 
+from db_writer import DatabaseWriter
 
 DB_NAME = "resources/dbase.db"
 DEFAULT_IMAGE_PATH = os.path.join(os.path.dirname(__file__), 'resources', 'def.png')
+THUMB_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'resources', '.thumbs')
+THUMB_SIZE = 50
+THUMB_MEMORY_LIMIT = 512
+STATEMENT_CACHE_SIZE = 64
+SEARCH_DEBOUNCE_MS = 250
+BCRYPT_ROUNDS = int(os.environ.get("LIBRARY_BCRYPT_ROUNDS", "12"))
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            login TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS books (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            author TEXT NOT NULL,
-            year INTEGER NOT NULL,
-            genre TEXT NOT NULL,
-            image_path TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+class LibraryDatabase:
+    def __init__(self, path=DB_NAME):
+        self.path = path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.writer = DatabaseWriter(self.connection)
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def close(self):
+        self.writer.close()
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections.clear()
+        self.local = threading.local()
+
+    def init_db(self):
+        conn = self.connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    login TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS books (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    author TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    genre TEXT NOT NULL,
+                    image_path TEXT
+                )
+            """)
+            user_columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+            if "bcrypt_rounds" not in user_columns:
+                conn.execute("ALTER TABLE users ADD COLUMN bcrypt_rounds INTEGER")
+                conn.execute("UPDATE users SET bcrypt_rounds = CAST(substr(password_hash, 5, 2) AS INTEGER)")
+            has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'books_fts'").fetchone()
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+                    title, author, genre, content='books', content_rowid='id'
+                )
+            """)
+            conn.executescript("""
+                CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+                    INSERT INTO books_fts(rowid, title, author, genre)
+                    VALUES (new.id, new.title, new.author, new.genre);
+                END;
+                CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+                    INSERT INTO books_fts(books_fts, rowid, title, author, genre)
+                    VALUES ('delete', old.id, old.title, old.author, old.genre);
+                END;
+                CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE ON books BEGIN
+                    INSERT INTO books_fts(books_fts, rowid, title, author, genre)
+                    VALUES ('delete', old.id, old.title, old.author, old.genre);
+                    INSERT INTO books_fts(rowid, title, author, genre)
+                    VALUES (new.id, new.title, new.author, new.genre);
+                END;
+            """)
+            if not has_fts:
+                conn.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+    def get_credentials(self, login: str) -> tuple[str, int] | None:
+        return self.connection().execute("SELECT password_hash, bcrypt_rounds FROM users WHERE login = ?",
+                                         (login,)).fetchone()
+
+    def add_user(self, login: str, password_hash: str, rounds: int) -> None:
+        conn = self.connection()
+        with conn:
+            conn.execute("INSERT INTO users (login, password_hash, bcrypt_rounds) VALUES (?, ?, ?)",
+                         (login, password_hash, rounds))
+
+    def update_password_hash(self, login: str, password_hash: str, rounds: int) -> None:
+        conn = self.connection()
+        with conn:
+            conn.execute("UPDATE users SET password_hash = ?, bcrypt_rounds = ? WHERE login = ?",
+                         (password_hash, rounds, login))
+
+    @staticmethod
+    def match_query(title: str, author: str) -> str:
+        terms = []
+        for column, text in (("title", title), ("author", author)):
+            for token in re.findall(r"\w+", text):
+                terms.append(f'{column} : "{token}"*')
+        return " AND ".join(terms)
+
+    def search_books(self, title: str = "", author: str = "") -> list[tuple]:
+        conn = self.connection()
+        query = self.match_query(title, author)
+        if query:
+            return conn.execute("""
+                SELECT b.* FROM books_fts
+                JOIN books b ON b.id = books_fts.rowid
+                WHERE books_fts MATCH ?
+                ORDER BY books_fts.rank
+            """, (query,)).fetchall()
+        return conn.execute("SELECT * FROM books").fetchall()
+
+    def get_book(self, book_id: int) -> tuple | None:
+        return self.connection().execute("SELECT * FROM books WHERE id = ?", (book_id,)).fetchone()
+
+    def add_book(self, title: str, author: str, year: int, genre: str, image_path: str) -> int:
+        return self.writer.submit(self.write_add_book, title, author, year, genre, image_path)
+
+    def update_book(self, book_id: int, title: str, author: str, year: int, genre: str, image_path: str) -> int:
+        return self.writer.submit(self.write_update_book, book_id, title, author, year, genre, image_path)
+
+    def delete_book(self, book_id: int) -> int:
+        return self.writer.submit(self.write_delete_book, book_id)
+
+    @staticmethod
+    def write_add_book(conn: sqlite3.Connection, title: str, author: str, year: int, genre: str, image_path: str) -> int:
+        return conn.execute("""
+            INSERT INTO books (title, author, year, genre, image_path)
+            VALUES (?, ?, ?, ?, ?)
+        """, (title, author, year, genre, image_path)).lastrowid
+
+    @staticmethod
+    def write_update_book(conn: sqlite3.Connection, book_id: int, title: str, author: str, year: int, genre: str,
+                          image_path: str) -> int:
+        conn.execute("""
+            UPDATE books SET title=?, author=?, year=?, genre=?, image_path=?
+            WHERE id=?
+        """, (title, author, year, genre, image_path, book_id))
+        return book_id
+
+    @staticmethod
+    def write_delete_book(conn: sqlite3.Connection, book_id: int) -> int:
+        conn.execute("DELETE FROM books WHERE id = ?", (book_id,))
+        return book_id
+
+def hash_password(password, rounds=BCRYPT_ROUNDS):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
 
 def check_password(password, hashed):
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+class ThumbnailSignals(QObject):
+    finished = pyqtSignal(str, str, QImage)
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, path, key, disk_path, signals):
+        super().__init__()
+        self.path = path
+        self.key = key
+        self.disk_path = disk_path
+        self.signals = signals
+
+    def run(self):
+        image = QImage(self.disk_path) if os.path.exists(self.disk_path) else QImage()
+        if image.isNull():
+            image = self.decode(self.path)
+            if image.isNull() and self.path != DEFAULT_IMAGE_PATH:
+                image = self.decode(DEFAULT_IMAGE_PATH)
+            if not image.isNull():
+                image.save(self.disk_path, "PNG")
+        self.signals.finished.emit(self.path, self.key, image)
+
+    @staticmethod
+    def decode(path):
+        reader = QImageReader(path)
+        size = reader.size()
+        if size.isValid():
+            reader.setScaledSize(size.scaled(THUMB_SIZE, THUMB_SIZE, Qt.AspectRatioMode.KeepAspectRatio))
+        return reader.read()
+
+class ThumbnailCache(QObject):
+    thumbnailReady = pyqtSignal(str, QPixmap)
+
+    def __init__(self, capacity=THUMB_MEMORY_LIMIT, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self.memory = OrderedDict()
+        self.pending = set()
+        self.pool = QThreadPool.globalInstance()
+        self.signals = ThumbnailSignals()
+        self.signals.finished.connect(self.on_finished)
+        self.placeholder = QPixmap(THUMB_SIZE, THUMB_SIZE)
+        self.placeholder.fill(Qt.GlobalColor.lightGray)
+        os.makedirs(THUMB_CACHE_DIR, exist_ok=True)
+
+    @staticmethod
+    def resolve(path):
+        if path and os.path.exists(path):
+            return path
+        return DEFAULT_IMAGE_PATH
+
+    @staticmethod
+    def cache_key(path):
+        return f"{os.path.abspath(path)}|{os.stat(path).st_mtime_ns}"
+
+    def get(self, path):
+        key = self.cache_key(path)
+        pixmap = self.memory.get(key)
+        if pixmap is not None:
+            self.memory.move_to_end(key)
+            return pixmap
+        if key not in self.pending:
+            self.pending.add(key)
+            disk_path = os.path.join(THUMB_CACHE_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".png")
+            self.pool.start(ThumbnailTask(path, key, disk_path, self.signals))
+        return self.placeholder
+
+    def on_finished(self, path, key, image):
+        self.pending.discard(key)
+        if image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.memory[key] = pixmap
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+        self.thumbnailReady.emit(path, pixmap)
+
+class AuthSignals(QObject):
+    finished = pyqtSignal(str, str, bool, str)
+
+class AuthTask(QRunnable):
+    def __init__(self, db, action, login, password, signals):
+        super().__init__()
+        self.db = db
+        self.action = action
+        self.login = login
+        self.password = password
+        self.signals = signals
+
+    def run(self):
+        try:
+            if self.action == "login":
+                ok, message = self.check_login()
+            else:
+                ok, message = self.register()
+        except Exception as e:
+            ok, message = False, str(e)
+        self.signals.finished.emit(self.action, self.login, ok, message)
+
+    def check_login(self):
+        credentials = self.db.get_credentials(self.login)
+        if not credentials or not check_password(self.password, credentials[0]):
+            return False, "Неверный логин или пароль"
+        if (credentials[1] or 0) < BCRYPT_ROUNDS:
+            self.db.update_password_hash(self.login, hash_password(self.password), BCRYPT_ROUNDS)
+        return True, ""
+
+    def register(self):
+        try:
+            self.db.add_user(self.login, hash_password(self.password), BCRYPT_ROUNDS)
+        except sqlite3.IntegrityError:
+            return False, "Логин уже существует"
+        return True, "Пользователь зарегистрирован"
+
+class SearchSignals(QObject):
+    finished = pyqtSignal(int, list)
+    failed = pyqtSignal(int, str)
+
+class SearchTask(QRunnable):
+    def __init__(self, searcher, generation, title, author):
+        super().__init__()
+        self.searcher = searcher
+        self.generation = generation
+        self.title = title
+        self.author = author
+
+    def is_stale(self):
+        return self.generation != self.searcher.generation
+
+    def run(self):
+        if self.is_stale():
+            return
+        conn = self.searcher.db.connection()
+        conn.set_progress_handler(self.is_stale, 1000)
+        try:
+            rows = self.searcher.db.search_books(self.title, self.author)
+        except sqlite3.Error as e:
+            if not self.is_stale():
+                self.searcher.signals.failed.emit(self.generation, str(e))
+            return
+        finally:
+            conn.set_progress_handler(None, 0)
+        self.searcher.signals.finished.emit(self.generation, rows)
+
+class BookSearcher(QObject):
+    resultsReady = pyqtSignal(list)
+    searchFailed = pyqtSignal(str)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.generation = 0
+        self.title = ""
+        self.author = ""
+        self.pool = QThreadPool.globalInstance()
+        self.signals = SearchSignals()
+        self.signals.finished.connect(self.on_finished)
+        self.signals.failed.connect(self.on_failed)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.timer.timeout.connect(self.search_now)
+
+    def schedule(self, title, author):
+        self.title = title
+        self.author = author
+        self.generation += 1
+        self.timer.start()
+
+    def search_now(self, title=None, author=None):
+        self.timer.stop()
+        if title is not None:
+            self.title = title
+        if author is not None:
+            self.author = author
+        self.generation += 1
+        self.pool.start(SearchTask(self, self.generation, self.title, self.author))
+
+    def cancel(self):
+        self.timer.stop()
+        self.generation += 1
+
+    def on_finished(self, generation, rows):
+        if generation == self.generation:
+            self.resultsReady.emit(rows)
+
+    def on_failed(self, generation, message):
+        if generation == self.generation:
+            self.searchFailed.emit(message)
+
+class BookTableModel(QAbstractTableModel):
+    HEADERS = ["ID", "Название", "Автор", "Год", "Жанр", "Изображение"]
+    COVER_COLUMN = 5
+
+    def __init__(self, thumbnails, parent=None):
+        super().__init__(parent)
+        self.thumbnails = thumbnails
+        self.rows = []
+        self.cover_rows = {}
+        self.thumbnails.thumbnailReady.connect(self.on_thumbnail_ready)
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.cover_rows = {}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if index.column() == self.COVER_COLUMN:
+            if role != Qt.ItemDataRole.DecorationRole:
+                return None
+            path = self.thumbnails.resolve(row[5])
+            self.cover_rows.setdefault(path, set()).add(index.row())
+            return self.thumbnails.get(path)
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(row[index.column()])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def book_id(self, row):
+        return self.rows[row][0]
+
+    def find_row(self, book_id):
+        for row, book in enumerate(self.rows):
+            if book[0] == book_id:
+                return row
+        return -1
+
+    def insert_book(self, book):
+        row = len(self.rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.append(book)
+        self.endInsertRows()
+        return row
+
+    def replace_book(self, row, book):
+        self.rows[row] = book
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    def remove_book(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.rows[row]
+        self.endRemoveRows()
+        self.cover_rows = {}
+
+    def on_thumbnail_ready(self, path, pixmap):
+        for row in self.cover_rows.get(path, ()):
+            index = self.index(row, self.COVER_COLUMN)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+class CoverDelegate(QStyledItemDelegate):
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_PanelItemViewItem, option, painter, option.widget)
+        pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+        if pixmap is None or pixmap.isNull():
+            return
+        rect = QStyle.alignedRect(option.direction, Qt.AlignmentFlag.AlignCenter, pixmap.size(), option.rect)
+        painter.drawPixmap(rect, pixmap)
+
+    def sizeHint(self, option, index):
+        return QSize(THUMB_SIZE, THUMB_SIZE)
+
 class BookViewDialog(QDialog):
     def __init__(self, book_data, parent=None):
         super().__init__(parent)
@@ -65,9 +471,10 @@ class BookViewDialog(QDialog):
         self.setLayout(layout)
 
 class AuthWindow(QWidget):
-    def __init__(self, main_window):
+    def __init__(self, main_window, db):
         super().__init__()
         self.main_window = main_window
+        self.db = db
         self.setWindowTitle("Авторизация")
         self.setGeometry(300, 300, 300, 200)
         layout = QVBoxLayout()
@@ -87,62 +494,71 @@ class AuthWindow(QWidget):
         self.setLayout(layout)
         self.login_btn.clicked.connect(self.login)
         self.register_btn.clicked.connect(self.register)
+        self.auth_signals = AuthSignals()
+        self.auth_signals.finished.connect(self.on_auth_finished)
 
-    def login(self):
+    def set_busy(self, busy):
+        for widget in (self.login_input, self.password_input, self.login_btn, self.register_btn):
+            widget.setEnabled(not busy)
+        if busy:
+            self.setCursor(Qt.CursorShape.WaitCursor)
+        else:
+            self.unsetCursor()
+
+    def start_auth(self, action):
         login = self.login_input.text()
         password = self.password_input.text()
         if not login or not password:
             QMessageBox.warning(self, "Заполните все поля")
             return
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT password_hash FROM users WHERE login = ?", (login,))
-        result = cursor.fetchone()
-        conn.close()
-        if result and check_password(password, result[0]):
+        self.set_busy(True)
+        QThreadPool.globalInstance().start(AuthTask(self.db, action, login, password, self.auth_signals))
+
+    def login(self):
+        self.start_auth("login")
+
+    def register(self):
+        self.start_auth("register")
+
+    def on_auth_finished(self, action, login, ok, message):
+        self.set_busy(False)
+        if not ok:
+            QMessageBox.warning(self, "Ошибка", message)
+        elif action == "login":
             self.accepted_login(login)
         else:
-            QMessageBox.warning(self, "Неверный логин или пароль")
-            
-    def register(self):
-        login = self.login_input.text()
-        password = self.password_input.text()
-        if not login or not password:
-            QMessageBox.warning(self, "Заполните все поля")
-            return
-        try:
-            hashed = hash_password(password)
-            conn = sqlite3.connect(DB_NAME)
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO users (login, password_hash) VALUES (?, ?)", (login, hashed))
-            conn.commit()
-            conn.close()
-            QMessageBox.information(self, "Пользователь зарегистрирован")
-        except sqlite3.IntegrityError:
-            QMessageBox.warning(self, "Логин уже существует")
+            QMessageBox.information(self, "Регистрация", message)
 
     def accepted_login(self, login):
         self.main_window.show_main_window()
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, db):
         super().__init__()
+        self.db = db
         self.setWindowTitle("Каталог библиотеки")
         self.setGeometry(100, 100, 1000, 600)
         self.central_widget = QStackedWidget()
         self.setCentralWidget(self.central_widget)
-        self.auth_window = AuthWindow(self)
+        self.auth_window = AuthWindow(self, db)
         self.central_widget.addWidget(self.auth_window)
-        self.library_window = LibraryWindow()
+        self.library_window = LibraryWindow(db)
         self.central_widget.addWidget(self.library_window)
         self.central_widget.setCurrentWidget(self.auth_window)
 
     def show_main_window(self):
         self.central_widget.setCurrentWidget(self.library_window)
 
+    def closeEvent(self, event):
+        self.library_window.searcher.cancel()
+        QThreadPool.globalInstance().waitForDone()
+        self.db.close()
+        event.accept()
+
 class LibraryWindow(QWidget):
-    def __init__(self):
+    def __init__(self, db):
         super().__init__()
+        self.db = db
         ui_path = os.path.join(os.path.dirname(__file__), 'ui/library.ui')
         uic.loadUi(ui_path, self)
         self.searchButton.clicked.connect(self.search_books)
@@ -150,35 +566,28 @@ class LibraryWindow(QWidget):
         self.addButton.clicked.connect(self.add_book)
         self.editButton.clicked.connect(self.edit_book)
         self.deleteButton.clicked.connect(self.delete_book)
-        self.booksTable.cellDoubleClicked.connect(self.view_book)
+        self.booksTable.doubleClicked.connect(self.view_book)
+        self.thumbnails = ThumbnailCache(parent=self)
+        self.model = BookTableModel(self.thumbnails, self)
+        self.booksTable.setModel(self.model)
+        self.booksTable.setItemDelegateForColumn(BookTableModel.COVER_COLUMN, CoverDelegate(self.booksTable))
+        self.booksTable.verticalHeader().setDefaultSectionSize(THUMB_SIZE)
+        self.searcher = BookSearcher(self.db, self)
+        self.searcher.resultsReady.connect(self.model.set_rows)
+        self.searcher.searchFailed.connect(lambda message: print(f"Ошибка поиска: {message}"))
+        self.searchTitleInput.textChanged.connect(self.on_search_text_changed)
+        self.searchAuthorInput.textChanged.connect(self.on_search_text_changed)
+        self.pending = {}
+        self.next_temp_id = -1
+        self.db.writer.writeFinished.connect(self.on_write_finished)
+        self.db.writer.writeFailed.connect(self.on_write_failed)
         self.load_books()
 
     def load_books(self, filter_title="", filter_author=""):
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        if filter_title or filter_author:
-            query = "SELECT * FROM books WHERE title LIKE ? AND author LIKE ?"
-            cursor.execute(query, (f"%{filter_title}%", f"%{filter_author}%"))
-        else:
-            cursor.execute("SELECT * FROM books")
-        rows = cursor.fetchall()
-        conn.close()
-        self.booksTable.setRowCount(len(rows))
-        for i, row in enumerate(rows):
-            self.booksTable.setItem(i, 0, QTableWidgetItem(str(row[0])))
-            self.booksTable.setItem(i, 1, QTableWidgetItem(row[1]))
-            self.booksTable.setItem(i, 2, QTableWidgetItem(row[2]))
-            self.booksTable.setItem(i, 3, QTableWidgetItem(str(row[3])))
-            self.booksTable.setItem(i, 4, QTableWidgetItem(row[4]))
-            img_path = row[5] if row[5] else DEFAULT_IMAGE_PATH
-            label = QLabel()
-            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            pixmap = QPixmap(img_path)
-            if pixmap.isNull():
-                pixmap = QPixmap(DEFAULT_IMAGE_PATH)
-            pixmap = pixmap.scaled(50, 50, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            label.setPixmap(pixmap)
-            self.booksTable.setCellWidget(i, 5, label)
+        self.searcher.search_now(filter_title, filter_author)
+
+    def on_search_text_changed(self):
+        self.searcher.schedule(self.searchTitleInput.text(), self.searchAuthorInput.text())
 
     def search_books(self):
         title = self.searchTitleInput.text()
@@ -190,50 +599,68 @@ class LibraryWindow(QWidget):
         self.searchAuthorInput.clear()
         self.load_books()
 
+    def refresh_books(self):
+        self.searcher.search_now()
+
     def add_book(self):
-        dialog = BookDialog(self, is_new=True)
+        dialog = BookDialog(self.db, self, book_id=self.next_temp_id, is_new=True)
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            self.load_books()
+            self.next_temp_id -= 1
+            self.model.insert_book(dialog.book)
+            self.pending[dialog.job_id] = "Не удалось добавить книгу"
 
     def edit_book(self):
-        current_row = self.booksTable.currentRow()
+        current_row = self.booksTable.currentIndex().row()
         if current_row < 0:
             QMessageBox.warning(self, "Выберите книгу для редактирования")
             return
-        book_id = int(self.booksTable.item(current_row, 0).text())
-        dialog = BookDialog(self, book_id=book_id, is_new=False)
+        book_id = self.model.book_id(current_row)
+        if book_id < 0:
+            QMessageBox.warning(self, "Подождите", "Книга ещё сохраняется")
+            return
+        dialog = BookDialog(self.db, self, book_id=book_id, is_new=False)
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            self.load_books()
+            row = self.model.find_row(book_id)
+            if row >= 0:
+                self.model.replace_book(row, dialog.book)
+            self.pending[dialog.job_id] = "Не удалось сохранить книгу"
 
     def delete_book(self):
-        current_row = self.booksTable.currentRow()
+        current_row = self.booksTable.currentIndex().row()
         if current_row < 0:
             QMessageBox.warning(self, "Выберите книгу для удаления")
             return
-        book_id = int(self.booksTable.item(current_row, 0).text())
-        reply = QMessageBox.question(self, "Удалить выбранную книгу?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        book_id = self.model.book_id(current_row)
+        if book_id < 0:
+            QMessageBox.warning(self, "Подождите", "Книга ещё сохраняется")
+            return
+        reply = QMessageBox.question(self, "Удаление", "Удалить выбранную книгу?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            conn = sqlite3.connect(DB_NAME)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM books WHERE id = ?", (book_id,))
-            conn.commit()
-            conn.close()
-            self.load_books()
-
-    def view_book(self, row, col):
-        book_id = int(self.booksTable.item(row, 0).text())
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM books WHERE id = ?", (book_id,))
-        book = cursor.fetchone()
-        conn.close()
+            self.model.remove_book(current_row)
+            self.pending[self.db.delete_book(book_id)] = "Не удалось удалить книгу"
+
+    def on_write_finished(self, job_id, result):
+        if self.pending.pop(job_id, None) is not None and not self.pending:
+            self.refresh_books()
+
+    def on_write_failed(self, job_id, message):
+        text = self.pending.pop(job_id, None)
+        if text is None:
+            return
+        self.refresh_books()
+        QMessageBox.critical(self, "Ошибка", f"{text}:\n{message}")
+
+    def view_book(self, index):
+        book_id = self.model.book_id(index.row())
+        book = self.db.get_book(book_id)
         if book:
             dialog = BookViewDialog(book, self)
             dialog.exec()
 
 class BookDialog(QDialog):
-    def __init__(self, parent=None, book_id=None, is_new=True):
+    def __init__(self, db, parent=None, book_id=None, is_new=True):
         super().__init__(parent)
+        self.db = db
         self.book_id = book_id
         self.is_new = is_new
         self.setWindowTitle("Добавить/Редактировать книгу")
@@ -268,11 +695,7 @@ class BookDialog(QDialog):
         self.cancel_btn.clicked.connect(self.reject)
 
     def load_book_data(self):
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM books WHERE id = ?", (self.book_id,))
-        row = cursor.fetchone()
-        conn.close()
+        row = self.db.get_book(self.book_id)
         if row:
             self.title_input.setText(row[1])
             self.author_input.setText(row[2])
@@ -301,25 +724,17 @@ class BookDialog(QDialog):
             return
         genre = self.genre_input.currentText()
         image_path = self.image_input.text()
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
+        self.book = (self.book_id, title, author, year, genre, image_path)
         if self.is_new:
-            cursor.execute("""
-                INSERT INTO books (title, author, year, genre, image_path)
-                VALUES (?, ?, ?, ?, ?)
-            """, (title, author, year, genre, image_path))
+            self.job_id = self.db.add_book(title, author, year, genre, image_path)
         else:
-            cursor.execute("""
-                UPDATE books SET title=?, author=?, year=?, genre=?, image_path=?
-                WHERE id=?
-            """, (title, author, year, genre, image_path, self.book_id))
-        conn.commit()
-        conn.close()
+            self.job_id = self.db.update_book(self.book_id, title, author, year, genre, image_path)
         self.accept()
 
 if __name__ == "__main__":
-    init_db()
+    db = LibraryDatabase(DB_NAME)
+    db.init_db()
     app = QApplication(sys.argv)
-    window = MainWindow()
+    window = MainWindow(db)
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,83 @@
+import time
+import queue
+import itertools
+from PyQt6.QtCore import QThread, pyqtSignal
+
+WRITE_GROUP_MS = 20
+
+
+class DatabaseWriter(QThread):
+    writeFinished = pyqtSignal(int, object)
+    writeFailed = pyqtSignal(int, str)
+
+    def __init__(self, connect, group_ms=WRITE_GROUP_MS, parent=None):
+        super().__init__(parent)
+        self.connect = connect
+        self.group_ms = group_ms
+        self.jobs = queue.Queue()
+        self.ids = itertools.count(1)
+
+    def submit(self, job, *args):
+        job_id = next(self.ids)
+        self.jobs.put((job_id, job, args))
+        if not self.isRunning():
+            self.start()
+        return job_id
+
+    def close(self):
+        if self.isRunning():
+            self.jobs.put(None)
+            self.wait()
+
+    def next_group(self):
+        first = self.jobs.get()
+        if first is None:
+            return [], True
+        group = [first]
+        deadline = time.monotonic() + self.group_ms / 1000
+        while (timeout := deadline - time.monotonic()) > 0:
+            try:
+                job = self.jobs.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if job is None:
+                return group, True
+            group.append(job)
+        return group, False
+
+    def run(self):
+        conn = self.connect()
+        conn.isolation_level = None
+        try:
+            stop = False
+            while not stop:
+                group, stop = self.next_group()
+                if group:
+                    self.execute(conn, group)
+        finally:
+            conn.close()
+
+    def execute(self, conn, group):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job_id, job, args in group:
+                conn.execute("SAVEPOINT job")
+                try:
+                    results.append((job_id, True, job(conn, *args)))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    results.append((job_id, False, str(e)))
+                conn.execute("RELEASE job")
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for job_id, _, _ in group:
+                self.writeFailed.emit(job_id, str(e))
+            return
+        for job_id, ok, result in results:
+            if ok:
+                self.writeFinished.emit(job_id, result)
+            else:
+                self.writeFailed.emit(job_id, result)
@@ -0,0 +1,299 @@
+import sys
+import csv
+import json
+import argparse
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ALL = "Все"
+ALL_CODE = -1
+TOTAL = "Итого"
+TOTAL_METRIC = -1
+FIRST_TASK_COLUMN = 3
+
+
+def parse_header(header):
+    score_column = header.index("Score") if "Score" in header else 7
+    return header[FIRST_TASK_COLUMN:score_column], score_column
+
+
+def parse_task_cell(cell):
+    cell = cell.strip()
+    if cell[:1] in ('+', '-'):
+        score, mark = "", cell
+    else:
+        score, _, mark = cell.partition('(')
+        mark = mark.rstrip(')')
+    count = mark[1:]
+    count = int(count) if count.isdigit() else 0
+    if mark.startswith('+'):
+        attempts = count + 1
+    elif mark.startswith('-'):
+        attempts = -count
+    else:
+        attempts = 0
+    return (int(score) if score.isdigit() else 0), attempts
+
+
+def format_task_cell(score, attempts):
+    if attempts > 0:
+        return f"{score}(+{attempts - 1 or ''})"
+    if attempts < 0:
+        return f"{score}({attempts})" if score else str(attempts)
+    return ""
+
+
+def parse_row(row, score_column=7, task_count=0):
+    if len(row) <= score_column:
+        return None
+    user_name = row[1]
+    login = row[2]
+    score_str = row[score_column]
+    if not login.startswith("sh-kaluga16-"):
+        return None
+    parts = login.split('-')
+    if len(parts) < 5:
+        return None
+    score = int(score_str) if score_str.isdigit() else 0
+    tasks = [parse_task_cell(cell) for cell in row[FIRST_TASK_COLUMN:FIRST_TASK_COLUMN + task_count]]
+    return login, user_name, score, parts[2], parts[3], tasks
+
+
+def parse_file(filename):
+    with open(filename, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        tasks, score_column = parse_header(next(reader, []))
+        rows = []
+        for row in reader:
+            entry = parse_row(row, score_column, len(tasks))
+            if entry is not None:
+                rows.append(entry)
+    return tasks, rows
+
+
+def dense_ranks(scores):
+    if np is not None:
+        scores = np.asarray(scores)
+        if not len(scores):
+            return np.zeros(0, dtype=np.int32)
+        return np.cumsum(np.concatenate(([True], scores[1:] != scores[:-1])), dtype=np.int32)
+    ranks = array('i')
+    rank = 0
+    prev_score = None
+    for score in scores:
+        if score != prev_score:
+            rank += 1
+            prev_score = score
+        ranks.append(rank)
+    return ranks
+
+
+class ParticipantStore:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.strings = []
+        self.scores = array('i')
+        self.schools = array('i')
+        self.classes = array('i')
+        self.school_names = []
+        self.class_names = []
+        self.school_codes = {}
+        self.class_codes = {}
+        self.logins = {}
+        self.task_names = []
+        self.task_codes = {}
+        self.task_scores = []
+        self.task_attempts = []
+
+    def __len__(self):
+        return len(self.scores)
+
+    @staticmethod
+    def intern(value, names, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+        return code
+
+    def add_task(self, name):
+        code = self.task_codes.get(name)
+        if code is None:
+            code = self.intern(name, self.task_names, self.task_codes)
+            self.task_scores.append(array('i', [0]) * len(self))
+            self.task_attempts.append(array('i', [0]) * len(self))
+        return code
+
+    def extend(self, rows, tasks=()):
+        task_codes = [self.add_task(name) for name in tasks]
+        start = len(self)
+        changed = set()
+        for login, name, score, school, class_num, cells in rows:
+            i = self.logins.get(login)
+            if i is None:
+                i = self.logins[login] = len(self)
+                self.strings.append(login)
+                self.strings.append(name)
+                self.scores.append(score)
+                self.schools.append(self.intern(school, self.school_names, self.school_codes))
+                self.classes.append(self.intern(class_num, self.class_names, self.class_codes))
+                for column in self.task_scores:
+                    column.append(0)
+                for column in self.task_attempts:
+                    column.append(0)
+            else:
+                self.scores[i] += score
+                if i < start:
+                    changed.add(i)
+            for task, (task_score, attempts) in zip(task_codes, cells):
+                if attempts and task_score >= self.task_scores[task][i]:
+                    self.task_scores[task][i] = task_score
+                    self.task_attempts[task][i] = attempts
+        return start, changed
+
+    def login(self, i):
+        return self.strings[2 * i]
+
+    def name(self, i):
+        return self.strings[2 * i + 1]
+
+    def metric_scores(self, metric):
+        return self.scores if metric == TOTAL_METRIC else self.task_scores[metric]
+
+    def task_cell(self, task, i):
+        return format_task_cell(self.task_scores[task][i], self.task_attempts[task][i])
+
+
+class LeaderboardIndex:
+    def __init__(self, store):
+        self.store = store
+        self.buckets = {}
+        self.ranked = {}
+
+    def build(self):
+        self.buckets = {}
+        self.ranked = {}
+        return self.add(0, len(self.store))
+
+    @staticmethod
+    def keys(school, class_num):
+        return (school, class_num), (school, ALL_CODE), (ALL_CODE, class_num), (ALL_CODE, ALL_CODE)
+
+    def add(self, start, stop, changed=()):
+        touched = set()
+        schools, classes = self.store.schools, self.store.classes
+        for i in range(start, stop):
+            for key in self.keys(schools[i], classes[i]):
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    bucket = self.buckets[key] = array('i')
+                bucket.append(i)
+                touched.add(key)
+        for i in changed:
+            touched.update(self.keys(schools[i], classes[i]))
+        for key in touched:
+            self.ranked.pop(key, None)
+        return touched
+
+    def key(self, school, class_num):
+        school_code = ALL_CODE if school == ALL else self.store.school_codes.get(school)
+        class_code = ALL_CODE if class_num == ALL else self.store.class_codes.get(class_num)
+        return school_code, class_code
+
+    def lookup(self, school, class_num, metric=TOTAL_METRIC):
+        key = self.key(school, class_num)
+        rows = self.buckets.get(key)
+        if rows is None:
+            return array('i'), array('i')
+        ranked = self.ranked.setdefault(key, {})
+        if metric not in ranked:
+            ranked[metric] = self.rank(rows, self.store.metric_scores(metric))
+        return ranked[metric]
+
+    def rank(self, rows, scores):
+        if np is not None:
+            rows = np.array(rows, dtype=np.int32)
+            bucket_scores = np.frombuffer(scores, dtype=np.int32)[rows]
+            order = np.argsort(-bucket_scores, kind='stable')
+            return rows[order], dense_ranks(bucket_scores[order])
+        rows = sorted(rows, key=scores.__getitem__, reverse=True)
+        return rows, dense_ranks(scores[i] for i in rows)
+
+
+def load_files(filenames, workers=None):
+    store = ParticipantStore()
+    if len(filenames) == 1:
+        tasks, rows = parse_file(filenames[0])
+        store.extend(rows, tasks)
+        return store
+    with ProcessPoolExecutor(workers) as executor:
+        for tasks, rows in executor.map(parse_file, filenames):
+            store.extend(rows, tasks)
+    return store
+
+
+def ranked_records(store, index, school=ALL, class_num=ALL, metric=TOTAL_METRIC):
+    rows, ranks = index.lookup(school, class_num, metric)
+    for i, rank in zip(rows, ranks):
+        i = int(i)
+        record = {
+            'place': int(rank),
+            'login': store.login(i),
+            'name': store.name(i),
+            'school': store.school_names[store.schools[i]],
+            'class': store.class_names[store.classes[i]],
+            'score': store.scores[i],
+        }
+        for task, task_name in enumerate(store.task_names):
+            record[task_name] = store.task_cell(task, i)
+        yield record
+
+
+def export_csv(records, fieldnames, f):
+    writer = csv.DictWriter(f, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(records)
+
+
+def export_json(records, fieldnames, f):
+    json.dump(list(records), f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Рейтинг участников олимпиады")
+    parser.add_argument("files", nargs="+", help="CSV-файлы результатов")
+    parser.add_argument("--school", default=ALL)
+    parser.add_argument("--class", dest="class_num", default=ALL)
+    parser.add_argument("--task", default=TOTAL, help="задача, по которой строится рейтинг")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("-o", "--output", help="файл для экспорта (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+    store = load_files(args.files)
+    if args.task == TOTAL:
+        metric = TOTAL_METRIC
+    elif args.task in store.task_codes:
+        metric = store.task_codes[args.task]
+    else:
+        parser.error(f"неизвестная задача: {args.task}")
+    index = LeaderboardIndex(store)
+    index.build()
+    records = ranked_records(store, index, args.school, args.class_num, metric)
+    fieldnames = ['place', 'login', 'name', 'school', 'class', 'score'] + store.task_names
+    export = export_json if args.format == "json" else export_csv
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            export(records, fieldnames, f)
+    else:
+        export(records, fieldnames, sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import sys
+import shutil
+import sqlite3
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+spec = importlib.util.spec_from_file_location("films", ROOT / "2_films.py")
+films = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(films)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "films_db.sqlite"
+    shutil.copy(ROOT / "resources" / "films_db.sqlite", path)
+    return str(path)
+
+
+@pytest.fixture
+def db(db_path):
+    manager = films.FilmDatabaseManager(db_path)
+    yield manager
+    manager.close()
+
+
+def test_migrations_set_user_version(db):
+    assert db.conn.execute("PRAGMA user_version").fetchone()[0] == len(films.MIGRATIONS)
+    indexes = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"films_title_idx", "films_genre_idx"} <= indexes
+    assert not {"films_id_uindex", "genres_id_uindex"} & indexes
+
+
+def test_migrations_run_once(db_path):
+    films.FilmDatabaseManager(db_path).close()
+    manager = films.FilmDatabaseManager(db_path)
+    assert manager.conn.execute("PRAGMA user_version").fetchone()[0] == len(films.MIGRATIONS)
+    manager.close()
+
+
+def test_failed_migration_rolls_back(db_path, monkeypatch):
+    monkeypatch.setattr(films, "MIGRATIONS", [films.MIGRATIONS[0][:-1] + ["SELECT * FROM missing_table"]])
+    with pytest.raises(sqlite3.OperationalError):
+        films.FilmDatabaseManager(db_path)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'films_id_uindex'").fetchone()
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'films_title_idx'").fetchone()
+    conn.close()
+
+
+def traced(db, call):
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        db.conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().startswith("SELECT")]
+
+
+def assert_uses_indexes(db, sql, rowid_order=False):
+    for detail in db.explain(sql):
+        assert "TEMP B-TREE" not in detail, (sql, detail)
+        if rowid_order and detail == "SCAN f":
+            continue
+        assert not (detail.startswith("SCAN") and "INDEX" not in detail), (sql, detail)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort", list(films.SORT_COLUMNS))
+def test_films_page_queries_use_indexes(db, sort, descending):
+    page = db.get_films_page(sort=sort, descending=descending)
+    after = tuple(page[-1][field] for _, field in films.SORT_COLUMNS[sort])
+    statements = traced(db, lambda: db.get_films_page(sort=sort, descending=descending))
+    statements += traced(db, lambda: db.get_films_page(after, sort=sort, descending=descending))
+    assert len(statements) == 2
+    for sql in statements:
+        assert_uses_indexes(db, sql, rowid_order=sort == "id")
+
+
+def test_get_film_query_uses_indexes(db):
+    statements = traced(db, lambda: db.get_film(1))
+    assert len(statements) == 1
+    assert_uses_indexes(db, statements[0])